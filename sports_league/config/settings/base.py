@@ -285,3 +285,41 @@ SOCIALACCOUNT_FORMS = {"signup": "sports_league.users.forms.UserSocialSignupForm
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Threads per web process that run queued CSV import jobs and replay the Elo ratings
+# after past games change. With 0 both are left to `manage.py process_import_jobs`,
+# which must then be running.
+IMPORT_JOB_WORKERS = env.int("DJANGO_IMPORT_JOB_WORKERS", default=2)
+# Seconds without a committed batch after which a running import job is considered
+# abandoned by a dead worker and is picked up again from its last checkpoint. Must be
+# longer than a batch takes to import.
+IMPORT_JOB_STALE_AFTER = env.int("DJANGO_IMPORT_JOB_STALE_AFTER", default=60 * 10)
+# Seconds a computed ranking stays cached; entries are also invalidated whenever a game
+# or team changes.
+STANDINGS_CACHE_TIMEOUT = env.int("DJANGO_STANDINGS_CACHE_TIMEOUT", default=60 * 60 * 24)
+# "offset" for numbered pages on the games list, "keyset" for cursor pagination whose
+# cost does not grow with the page depth.
+GAMES_LIST_PAGINATION = env("DJANGO_GAMES_LIST_PAGINATION", default="offset")
+# How the games list gets its page count when the cached count is cold: "exact" runs
+# COUNT(*), "estimated" uses the PostgreSQL planner estimate.
+GAMES_LIST_COUNT = env("DJANGO_GAMES_LIST_COUNT", default="exact")
+# The cached games count is refreshed from the table at least this often (seconds).
+GAMES_COUNT_CACHE_TIMEOUT = env.int("DJANGO_GAMES_COUNT_CACHE_TIMEOUT", default=60 * 60)
+# Bearer tokens accepted by the bulk game ingest API; the API is closed when empty.
+INGEST_API_TOKENS = env.list("DJANGO_INGEST_API_TOKENS", default=[])
+# Games written per transaction by the ingest API.
+INGEST_BATCH_SIZE = env.int("DJANGO_INGEST_BATCH_SIZE", default=1000)
+# Elo ratings: rating of a team before its first game, and the most a single game moves it.
+ELO_INITIAL_RATING = env.float("DJANGO_ELO_INITIAL_RATING", default=1500.0)
+ELO_K_FACTOR = env.float("DJANGO_ELO_K_FACTOR", default=20.0)
+# Rules breaking ties on points in the ranking, in order, from
+# sports_league_app.tiebreakers.TIEBREAK_RULES. Teams level after all of them share a rank.
+STANDINGS_TIEBREAKERS = env.list(
+    "DJANGO_STANDINGS_TIEBREAKERS",
+    default=[
+        "head_to_head_points",
+        "head_to_head_goal_difference",
+        "head_to_head_goals_for",
+        "goal_difference",
+        "goals_for",
+    ],
+)
@@ -33,3 +33,7 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore # noqa: F405
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "http://media.testserver"
+
+# IMPORT JOBS
+# ------------------------------------------------------------------------------
+IMPORT_JOB_WORKERS = 0
@@ -1,15 +1,91 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from .models import Game, Team
+from .history import rebuild_history
+from .models import Game, ImportJob, League, Season, StandingsSnapshot, Team, TeamSeasonStanding, UploadBatch
+from .standings import recompute_season_standings, recompute_standings
 
 # Register your models here.
 
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
-    pass
+    list_display = [
+        "name",
+        "wins",
+        "draws",
+        "loses",
+        "goals_for",
+        "goals_against",
+        "goal_difference",
+        "points",
+        "rating",
+    ]
+    actions = ["recompute_standings"]
+
+    @admin.action(description="Recompute standings of selected teams from games")
+    def recompute_standings(self, request, queryset):
+        changed = recompute_standings(teams=queryset)
+        self.message_user(request, f"Recomputed standings, {len(changed)} team(s) corrected.", messages.SUCCESS)
 
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "season", "round"]
+    list_filter = ["season"]
+    search_fields = ["fixture_id"]
+
+
+@admin.register(League)
+class LeagueAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(Season)
+class SeasonAdmin(admin.ModelAdmin):
+    list_display = ["name", "league", "created_at"]
+    list_filter = ["league"]
+    actions = ["recompute_standings", "rebuild_history"]
+
+    @admin.action(description="Recompute standings of selected seasons from games")
+    def recompute_standings(self, request, queryset):
+        changed = sum(len(recompute_season_standings(season)) for season in queryset)
+        self.message_user(request, f"Recomputed standings, {changed} row(s) corrected.", messages.SUCCESS)
+
+    @admin.action(description="Rebuild standings history of selected seasons")
+    def rebuild_history(self, request, queryset):
+        rounds = sum(rebuild_history(season, from_round=0) for season in queryset)
+        self.message_user(request, f"Rebuilt standings history, {rounds} round(s).", messages.SUCCESS)
+
+
+@admin.register(TeamSeasonStanding)
+class TeamSeasonStandingAdmin(admin.ModelAdmin):
+    list_display = [
+        "team",
+        "season",
+        "wins",
+        "draws",
+        "loses",
+        "goals_for",
+        "goals_against",
+        "goal_difference",
+        "points",
+    ]
+    list_filter = ["season"]
+
+
+@admin.register(StandingsSnapshot)
+class StandingsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["team", "season", "round", "position", "points"]
+    list_filter = ["season"]
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ["file", "status", "rows_processed", "created_at", "finished_at"]
+    list_filter = ["status"]
+
+
+@admin.register(UploadBatch)
+class UploadBatchAdmin(admin.ModelAdmin):
+    list_display = ["file_name", "row_count", "created_at", "finished_at"]
+    search_fields = ["file_name", "content_hash"]
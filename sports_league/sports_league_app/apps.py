@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SportsLeagueAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sports_league_app"
+
+    def ready(self):
+        # Connects the signal receivers of the import job workers.
+        from sports_league_app import jobs  # noqa: F401
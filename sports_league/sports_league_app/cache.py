@@ -0,0 +1,107 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+STANDINGS_VERSION_KEY = "standings:version"
+CACHE_HITS_KEY = "standings:cache:hits"
+CACHE_MISSES_KEY = "standings:cache:misses"
+STANDINGS_CHANGED_AT_KEY = "standings:changed_at"
+GAMES_COUNT_KEY = "games:count"
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key is missing or was evicted.
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_standings_version():
+    version = cache.get(STANDINGS_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version key never brings back entries cached under an old version.
+        cache.add(STANDINGS_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(STANDINGS_VERSION_KEY)
+    return version
+
+
+def get_standings_changed_at():
+    """
+    Return the time (seconds since the epoch) of the last standings change.
+    """
+    changed_at = cache.get(STANDINGS_CHANGED_AT_KEY)
+    if changed_at is None:
+        cache.add(STANDINGS_CHANGED_AT_KEY, time.time(), timeout=None)
+        changed_at = cache.get(STANDINGS_CHANGED_AT_KEY)
+    return changed_at
+
+
+def _bump_version():
+    try:
+        cache.incr(STANDINGS_VERSION_KEY)
+    except ValueError:
+        cache.set(STANDINGS_VERSION_KEY, time.time_ns(), timeout=None)
+    cache.set(STANDINGS_CHANGED_AT_KEY, time.time(), timeout=None)
+
+
+def bump_standings_version():
+    """
+    Invalidate everything cached for the current standings.
+
+    The version is bumped right away, so the rest of the transaction reads fresh data, and
+    again on commit, so nothing computed from the old rows in between outlives it.
+    """
+    _bump_version()
+    transaction.on_commit(_bump_version)
+
+
+def get_or_compute(name, compute):
+    """
+    Return the value cached under `name` for the current standings version, computing
+    and storing it on a miss.
+    """
+    key = f"standings:{name}:{get_standings_version()}"
+    value = cache.get(key)
+    if value is None:
+        _incr(CACHE_MISSES_KEY)
+        value = compute()
+        cache.set(key, value, timeout=settings.STANDINGS_CACHE_TIMEOUT)
+    else:
+        _incr(CACHE_HITS_KEY)
+    return value
+
+
+def cache_stats():
+    return {
+        "hits": cache.get(CACHE_HITS_KEY, 0),
+        "misses": cache.get(CACHE_MISSES_KEY, 0),
+        "version": get_standings_version(),
+    }
+
+
+def get_cached_games_count():
+    return cache.get(GAMES_COUNT_KEY)
+
+
+def set_cached_games_count(count):
+    cache.set(GAMES_COUNT_KEY, count, timeout=settings.GAMES_COUNT_CACHE_TIMEOUT)
+
+
+def _adjust_games_count(delta):
+    try:
+        cache.incr(GAMES_COUNT_KEY, delta)
+    except ValueError:
+        # Cold cache, the next read counts the table.
+        pass
+
+
+def adjust_games_count(delta):
+    """
+    Add `delta` to the cached games count once the current transaction commits.
+    """
+    if delta:
+        transaction.on_commit(lambda: _adjust_games_count(delta))
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Test transactions are rolled back without bumping the standings version.
+    cache.clear()
+    yield
+    cache.clear()
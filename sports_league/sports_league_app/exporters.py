@@ -0,0 +1,132 @@
+import csv
+import json
+
+from django.db.models import F
+
+from sports_league_app.models import Game, Team, TeamSeasonStanding
+from sports_league_app.standings import compute_ranking
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (NDJSON key, CSV header) of every column. The games header matches the import format,
+# so an export can be imported again.
+GAME_EXPORT_FIELDS = [
+    ("first_team", "Team_1 name"),
+    ("first_team_score", "Team_1 score"),
+    ("second_team", "Team_2 name"),
+    ("second_team_score", "Team_2 score"),
+    ("fixture_id", "Fixture id"),
+    ("round", "Round"),
+]
+STANDINGS_EXPORT_FIELDS = [
+    ("rank", "Rank"),
+    ("team", "Team"),
+    ("wins", "Wins"),
+    ("draws", "Draws"),
+    ("loses", "Loses"),
+    ("goals_for", "Goals for"),
+    ("goals_against", "Goals against"),
+    ("goal_difference", "Goal difference"),
+    ("points", "Points"),
+]
+STANDINGS_COUNTERS = ["wins", "draws", "loses", "goals_for", "goals_against", "goal_difference"]
+
+
+def game_rows(games=None, chunk_size=EXPORT_CHUNK_SIZE, season=None):
+    """
+    Yield the export row of every game, or of the games of `season`, reading
+    `chunk_size` games at a time.
+    """
+    if games is None:
+        games = Game.objects.all()
+    if season is not None:
+        games = games.filter(season=season)
+    games = (
+        games.select_related("first_team", "second_team")
+        .only(
+            "first_team__name",
+            "first_team_score",
+            "second_team__name",
+            "second_team_score",
+            "fixture_id",
+            "round",
+        )
+        .order_by("pk")
+    )
+    for game in games.iterator(chunk_size=chunk_size):
+        yield [
+            game.first_team.name,
+            game.first_team_score,
+            game.second_team.name,
+            game.second_team_score,
+            game.fixture_id or "",
+            "" if game.round is None else game.round,
+        ]
+
+
+def standings_rows(chunk_size=EXPORT_CHUNK_SIZE, season=None):
+    """
+    Yield the export row of every team of the ranking table, over all seasons or within
+    `season`, in the order and with the ranks of `compute_ranking`.
+
+    The ranking itself is held in memory to apply the tiebreakers, the counters of its
+    teams are read `chunk_size` teams at a time.
+    """
+    ranking = compute_ranking(season=season)
+    if season is None:
+        rows = Team.objects.all()
+    else:
+        rows = TeamSeasonStanding.objects.filter(season=season).annotate(name=F("team__name"))
+    for start in range(0, len(ranking), chunk_size):
+        chunk = ranking[start : start + chunk_size]
+        counters = {
+            row["name"]: row
+            for row in rows.filter(name__in=[ranked["name"] for ranked in chunk]).values("name", *STANDINGS_COUNTERS)
+        }
+        for ranked in chunk:
+            row = counters[ranked["name"]]
+            yield [ranked["rank"], ranked["name"], *(row[field] for field in STANDINGS_COUNTERS), ranked["points"]]
+
+
+class Echo:
+    """
+    File-like object handing back what is written to it, lets `csv.writer` format a
+    single row without buffering.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(Echo(), lineterminator="\n")
+    yield writer.writerow([header for _, header in fields])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(fields, rows):
+    keys = [key for key, _ in fields]
+    for row in rows:
+        yield json.dumps(dict(zip(keys, row))) + "\n"
+
+
+EXPORT_DATASETS = {
+    "games": (GAME_EXPORT_FIELDS, game_rows),
+    "standings": (STANDINGS_EXPORT_FIELDS, standings_rows),
+}
+
+EXPORT_FORMATS = {"csv": csv_lines, "ndjson": ndjson_lines}
+EXPORT_CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def export_lines(dataset, export_format="csv", chunk_size=EXPORT_CHUNK_SIZE, season=None):
+    """
+    Return a lazy iterator over the lines of `dataset` in `export_format`, over all
+    seasons or within `season`.
+
+    Rows are read from the database with a server-side cursor where the backend supports
+    it, so memory use does not depend on the size of the table.
+    """
+    fields, rows = EXPORT_DATASETS[dataset]
+    return EXPORT_FORMATS[export_format](fields, rows(chunk_size=chunk_size, season=season))
@@ -19,15 +19,11 @@ class GameAddForm(forms.ModelForm):
 
     class Meta:
         model = Game
-        fields = ["first_team", "first_team_score", "second_team", "second_team_score"]
+        fields = ["first_team", "first_team_score", "second_team", "second_team_score", "season", "round"]
 
 
 class GameEditForm(forms.ModelForm):
-    def __init__(self, *args, **kwargs):
-        super(GameEditForm, self).__init__(*args, **kwargs)
-        self.fields["first_team"].disabled = True
-        self.fields["second_team"].disabled = True
-
+    # The teams of a game can't be changed, the template shows them next to the scores.
     class Meta:
         model = Game
-        fields = ["first_team", "second_team", "first_team_score", "second_team_score"]
+        fields = ["first_team_score", "second_team_score"]
@@ -0,0 +1,138 @@
+from django.db import transaction
+from django.db.models import F, Max
+
+from sports_league_app.models import Game, Season, StandingsSnapshot, Team
+from sports_league_app.strategy import (
+    DefaultPointsCalculation,
+    StandingsDelta,
+    aggregate_game_results,
+    merge_deltas,
+    new_deltas,
+)
+from sports_league_app.tiebreakers import break_ties, team_record
+
+SNAPSHOT_FIELDS = ["wins", "draws", "loses", "goals_for", "goals_against", "goal_difference", "points"]
+
+
+def round_snapshots(season_id, round_number, totals, names, points_strategy):
+    """
+    Return the snapshot rows of the {team_id: StandingsDelta} `totals` after a round,
+    positioned like the ranking table: by points, teams level on points ordered by the
+    STANDINGS_TIEBREAKERS rules over the games up to that round, then by goal
+    difference, goals scored and name.
+    """
+    snapshots = {}
+    for team_id, total in totals.items():
+        snapshot = StandingsSnapshot(
+            season_id=season_id,
+            round=round_number,
+            team_id=team_id,
+            wins=total.wins,
+            draws=total.draws,
+            loses=total.loses,
+            goals_for=total.goals_for,
+            goals_against=total.goals_against,
+            goal_difference=total.goals_for - total.goals_against,
+        )
+        snapshot.points = points_strategy.calculate_points(snapshot)
+        snapshots[team_id] = snapshot
+    team_ids = sorted(
+        snapshots,
+        key=lambda team_id: (
+            -snapshots[team_id].points,
+            -snapshots[team_id].goal_difference,
+            -snapshots[team_id].goals_for,
+            names[team_id],
+        ),
+    )
+    ranking = []
+    for position, team_id in enumerate(team_ids, start=1):
+        points = snapshots[team_id].points
+        rank = ranking[-1]["rank"] if ranking and ranking[-1]["points"] == points else position
+        ranking.append({"rank": rank, "name": names[team_id], "points": points, "team_id": team_id})
+    games = Game.objects.filter(season=season_id, round__lte=round_number)
+    records = {team_id: team_record(snapshot) for team_id, snapshot in snapshots.items()}
+    ranking = break_ties(ranking, team_ids, games, points_strategy, records)
+    for position, row in enumerate(ranking, start=1):
+        snapshots[row["team_id"]].position = position
+    return [snapshots[row["team_id"]] for row in ranking]
+
+
+def rebuild_history(season, points_strategy=None, from_round=None):
+    """
+    Bring the standings snapshots of a season up to date with its games.
+
+    Only the rounds from `history_stale_from` (or the earlier `from_round`) on are rebuilt,
+    along with any unbuilt rounds right before them: the snapshot of the round before is
+    the running total and each later round adds the
+    results of its games, read for all of those rounds with one aggregate query. Returns
+    the number of rounds built.
+    """
+    if points_strategy is None:
+        points_strategy = DefaultPointsCalculation()
+
+    with transaction.atomic():
+        # Serializes rebuilds of the season; games invalidating its history wait for this one.
+        season = Season.objects.select_for_update().get(pk=season.pk)
+        first_round = min(
+            (round_number for round_number in (season.history_stale_from, from_round) if round_number is not None),
+            default=None,
+        )
+        if first_round is None:
+            return 0
+        # Rounds without snapshots between the last built one and `first_round` are filled in,
+        # so the running total is seeded from the round right before.
+        last_built = StandingsSnapshot.objects.filter(season=season, round__lt=first_round).aggregate(Max("round"))[
+            "round__max"
+        ]
+        if last_built is not None:
+            first_round = last_built + 1
+
+        StandingsSnapshot.objects.filter(season=season, round__gte=first_round).delete()
+        totals = new_deltas()
+        for snapshot in StandingsSnapshot.objects.filter(season=season, round=first_round - 1):
+            totals[snapshot.team_id] = StandingsDelta(
+                snapshot.wins, snapshot.draws, snapshot.loses, snapshot.goals_for, snapshot.goals_against
+            )
+        round_deltas = aggregate_game_results(Game.objects.filter(season=season, round__gte=first_round), by="round")
+        last_round = max(round_deltas, default=first_round - 1)
+
+        team_ids = set(totals).union(*round_deltas.values())
+        names = dict(Team.objects.filter(pk__in=team_ids).values_list("pk", "name"))
+        snapshots = []
+        for round_number in range(first_round, last_round + 1):
+            merge_deltas(totals, round_deltas.get(round_number, {}))
+            snapshots.extend(round_snapshots(season.pk, round_number, totals, names, points_strategy))
+        StandingsSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+        Season.objects.filter(pk=season.pk).update(history_stale_from=None)
+    return last_round - first_round + 1
+
+
+def ensure_history(season):
+    if season.history_stale_from is not None:
+        rebuild_history(season)
+        season.history_stale_from = None
+
+
+def get_table_after_round(season, round_number):
+    """
+    Return the table of a season after a round, rebuilding out of date snapshots first.
+    """
+    ensure_history(season)
+    return list(
+        StandingsSnapshot.objects.filter(season=season, round=round_number)
+        .order_by("position")
+        .values("position", *SNAPSHOT_FIELDS, name=F("team__name"))
+    )
+
+
+def get_team_history(season, team):
+    """
+    Return a team's position and points after every round of a season.
+    """
+    ensure_history(season)
+    return list(
+        StandingsSnapshot.objects.filter(season=season, team=team)
+        .order_by("round")
+        .values("round", "position", "points")
+    )
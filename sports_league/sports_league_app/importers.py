@@ -0,0 +1,274 @@
+import csv
+import hashlib
+from collections import defaultdict
+from copy import copy
+from itertools import islice
+
+from django.db import transaction
+
+from sports_league_app.cache import adjust_games_count
+from sports_league_app.models import Game, RatingsState, Season, Team
+from sports_league_app.ratings import rated_result
+from sports_league_app.standings import apply_season_deltas
+from sports_league_app.strategy import GAME_RESULT_FIELDS, DefaultPointsCalculation, merge_deltas, new_deltas
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class InvalidCSVFormat(ValueError):
+    pass
+
+
+class CSVStreamReader:
+    """
+    Iterate CSV rows over an iterable of byte chunks, such as `UploadedFile.chunks()`.
+
+    Chunks are split on the newline byte, which never occurs inside a multi-byte UTF-8
+    sequence, so every line decodes on its own and only the current line is held in
+    memory. `byte_offset` is the position just after the last row handed out.
+    """
+
+    def __init__(self, chunks, encoding="utf-8", skip_header=True, byte_offset=0):
+        self.chunks = chunks
+        self.encoding = encoding
+        self.skip_header = skip_header
+        self.byte_offset = byte_offset
+
+    def lines(self):
+        pending = b""
+        for chunk in self.chunks:
+            pending += chunk
+            start = 0
+            end = pending.find(b"\n")
+            while end != -1:
+                line = pending[start : end + 1]
+                self.byte_offset += len(line)
+                yield line.decode(self.encoding)
+                start = end + 1
+                end = pending.find(b"\n", start)
+            pending = pending[start:]
+        if pending:
+            self.byte_offset += len(pending)
+            yield pending.decode(self.encoding)
+
+    def __iter__(self):
+        lines = self.lines()
+        if self.skip_header:
+            next(lines, None)
+        return csv.reader(lines, delimiter=",")
+
+
+def content_hash(chunks):
+    sha256 = hashlib.sha256()
+    for chunk in chunks:
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def parse_row(row):
+    """
+    Validate a `first team, first score, second team, second score[, fixture id[, round]]`
+    CSV row.
+    """
+    if len(row) not in (4, 5, 6):
+        raise InvalidCSVFormat("Invalid CSV Format")
+    first_team_name, first_team_score, second_team_name, second_team_score = row[:4]
+    fixture_id = row[4].strip() if len(row) > 4 else ""
+    round_number = row[5].strip() if len(row) > 5 else ""
+    try:
+        first_team_score = int(first_team_score)
+        second_team_score = int(second_team_score)
+    except ValueError:
+        raise InvalidCSVFormat(f"Invalid score in row: {','.join(row)}")
+    if first_team_score < 0 or second_team_score < 0:
+        raise InvalidCSVFormat(f"Invalid score in row: {','.join(row)}")
+    if round_number:
+        if not round_number.isdigit():
+            raise InvalidCSVFormat(f"Invalid round in row: {','.join(row)}")
+        round_number = int(round_number)
+    return (
+        first_team_name,
+        first_team_score,
+        second_team_name,
+        second_team_score,
+        fixture_id or None,
+        round_number if round_number != "" else None,
+    )
+
+
+class GameImporter:
+    """
+    Set-based import of game rows.
+
+    Rows are consumed in batches of `batch_size`: the batch's unseen team names are
+    resolved with one query and missing ones are created with `bulk_create`, games are
+    inserted with `bulk_create` and the standings change returned by the strategy's
+    `apply_games` is accumulated in memory and written back with a single `bulk_update`
+    once all rows are in.
+
+    Rows carrying a fixture id are upserted on it: the batch's existing fixtures are read
+    with one query, changed ones are written back with one `bulk_update` and only their
+    net standings change is applied, unchanged ones are left alone.
+
+    With a `season` the games are added to it, and its standings rows are updated along
+    with the teams' totals. The standings history of the rounds the games fall in is
+    marked out of date once per batch. New games update the Elo ratings as they are
+    inserted, changed fixtures whose result flips mark the ratings out of date.
+    """
+
+    def __init__(self, points_strategy=None, batch_size=DEFAULT_BATCH_SIZE, upload_batch=None, season=None):
+        if points_strategy is None:
+            points_strategy = DefaultPointsCalculation()
+        self.points_strategy = points_strategy
+        self.batch_size = batch_size
+        self.upload_batch = upload_batch
+        self.season = season
+        # {season_id: {team_id: StandingsDelta}}
+        self.deltas = defaultdict(new_deltas)
+        # (season_id, round) pairs whose standings history the pending deltas change.
+        self.rounds = set()
+        self.ratings_stale = False
+        self.team_ids = {}
+        self.rows_imported = 0
+        self.games_updated = 0
+
+    def import_rows(self, rows):
+        """
+        Import an iterable of rows, reading at most `batch_size` of them at a time.
+        """
+        with transaction.atomic():
+            for batch in batched(rows, self.batch_size):
+                self.import_batch(batch)
+            self.apply_standings()
+        return self.rows_imported
+
+    def import_checkpointed(self, rows, checkpoint):
+        """
+        Import an iterable of rows committing every batch on its own.
+
+        `checkpoint(batch_rows)` is called inside each batch's transaction, so whatever it
+        records is committed together with the games of that batch.
+        """
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                self.import_batch(batch)
+                self.apply_standings()
+                checkpoint(len(batch))
+        return self.rows_imported
+
+    def import_batch(self, rows):
+        games = [parse_row(row) for row in rows]
+        self.resolve_teams({name for game in games for name in (game[0], game[2])})
+        fixtures = {game[4]: game for game in games if game[4] is not None}
+        self.insert_games([game for game in games if game[4] is None])
+        self.upsert_games(fixtures)
+        self.rows_imported += len(games)
+
+    def apply_standings(self):
+        apply_season_deltas(self.deltas, self.points_strategy)
+        Season.objects.invalidate_history(self.rounds)
+        if self.ratings_stale:
+            RatingsState.objects.mark_stale()
+            self.ratings_stale = False
+        self.deltas.clear()
+        self.rounds.clear()
+
+    def add_games(self, games, sign=1):
+        games_by_season = defaultdict(list)
+        for game in games:
+            games_by_season[game.season_id].append(game)
+            self.rounds.add((game.season_id, game.round))
+        for season_id, season_games in games_by_season.items():
+            merge_deltas(self.deltas[season_id], self.points_strategy.apply_games(season_games, sign))
+
+    def resolve_teams(self, names):
+        missing = names - self.team_ids.keys()
+        if not missing:
+            return
+        self.team_ids.update(Team.objects.filter(name__in=missing).values_list("name", "pk"))
+        missing -= self.team_ids.keys()
+        if missing:
+            Team.objects.bulk_create([Team(name=name) for name in missing], ignore_conflicts=True)
+            self.team_ids.update(Team.objects.filter(name__in=missing).values_list("name", "pk"))
+
+    def insert_games(self, games):
+        if not games:
+            return
+        objs = []
+        for first_team_name, first_team_score, second_team_name, second_team_score, fixture_id, round_number in games:
+            first_team_id = self.team_ids[first_team_name]
+            second_team_id = self.team_ids[second_team_name]
+            objs.append(
+                Game(
+                    first_team_id=first_team_id,
+                    first_team_score=first_team_score,
+                    second_team_id=second_team_id,
+                    second_team_score=second_team_score,
+                    upload_batch=self.upload_batch,
+                    fixture_id=fixture_id,
+                    season=self.season,
+                    round=round_number,
+                )
+            )
+        self.add_games(objs)
+        Game.objects.bulk_create(objs)
+        Team.objects.rate_games(objs)
+        adjust_games_count(len(objs))
+
+    def upsert_games(self, fixtures):
+        """
+        Insert or update the games of a {fixture_id: row} mapping, the last row of a
+        fixture within the batch wins.
+        """
+        if not fixtures:
+            return
+        existing = Game.objects.select_for_update().in_bulk(list(fixtures), field_name="fixture_id")
+        new_games = []
+        replaced = []
+        changed = []
+        for fixture_id, game_row in fixtures.items():
+            game = existing.get(fixture_id)
+            if game is None:
+                new_games.append(game_row)
+                continue
+            first_team_name, first_team_score, second_team_name, second_team_score, _, round_number = game_row
+            values = (
+                self.team_ids[first_team_name],
+                first_team_score,
+                self.team_ids[second_team_name],
+                second_team_score,
+                round_number,
+            )
+            stored = (
+                game.first_team_id,
+                game.first_team_score,
+                game.second_team_id,
+                game.second_team_score,
+                game.round,
+            )
+            season_id = game.season_id if self.season is None else self.season.pk
+            if values == stored and season_id == game.season_id:
+                continue
+            replaced.append(copy(game))
+            (
+                game.first_team_id,
+                game.first_team_score,
+                game.second_team_id,
+                game.second_team_score,
+                game.round,
+            ) = values
+            game.season_id = season_id
+            if rated_result(game) != rated_result(replaced[-1]):
+                self.ratings_stale = True
+            changed.append(game)
+        self.add_games(replaced, sign=-1)
+        self.add_games(changed)
+        Game.objects.bulk_update(changed, [*GAME_RESULT_FIELDS, "season", "round"])
+        self.games_updated += len(changed)
+        self.insert_games(new_games)
@@ -0,0 +1,119 @@
+import hmac
+import json
+
+from django.conf import settings
+
+from sports_league_app.importers import GameImporter, InvalidCSVFormat, parse_row
+from sports_league_app.models import Team
+
+RECORD_FIELDS = ["first_team", "first_team_score", "second_team", "second_team_score"]
+TEAM_FIELDS = ["first_team", "second_team"]
+SCORE_FIELDS = ["first_team_score", "second_team_score"]
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def has_valid_token(request):
+    """
+    Check the request's `Authorization: Bearer <token>` header against INGEST_API_TOKENS.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    return any(hmac.compare_digest(token.encode(), allowed.encode()) for allowed in settings.INGEST_API_TOKENS)
+
+
+def ndjson_records(lines):
+    """
+    Decode one game object per non-blank line; a line that isn't JSON is handed on as an
+    `InvalidRecord` so it gets its own error result.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield InvalidRecord("Invalid JSON")
+
+
+def record_to_row(record):
+    """
+    Turn a `{"first_team", "first_team_score", "second_team", "second_team_score",
+    "fixture_id", "round"}` object into an import row, validated like a CSV row.
+
+    Team names must be non-empty strings that fit Team.name and differ from each other,
+    scores must be JSON integers.
+    """
+    if isinstance(record, InvalidRecord):
+        raise record
+    if not isinstance(record, dict) or any(field not in record for field in RECORD_FIELDS):
+        raise InvalidRecord(f"Expected an object with {', '.join(RECORD_FIELDS)}")
+    max_length = Team._meta.get_field("name").max_length
+    for field in TEAM_FIELDS:
+        name = record[field]
+        if not isinstance(name, str) or not name.strip() or len(name) > max_length:
+            raise InvalidRecord(f"{field} must be a team name of 1 to {max_length} characters")
+    if record["first_team"] == record["second_team"]:
+        raise InvalidRecord("first_team and second_team must be different teams")
+    for field in SCORE_FIELDS:
+        # bool is an int subclass, `true` is not a score.
+        if isinstance(record[field], bool) or not isinstance(record[field], int):
+            raise InvalidRecord(f"{field} must be an integer")
+    row = [str(record[field]) for field in RECORD_FIELDS]
+    fixture_id, round_number = record.get("fixture_id"), record.get("round")
+    if fixture_id is not None or round_number is not None:
+        row.append("" if fixture_id is None else str(fixture_id))
+    if round_number is not None:
+        row.append(str(round_number))
+    try:
+        parse_row(row)
+    except InvalidCSVFormat as e:
+        raise InvalidRecord(str(e))
+    return row
+
+
+def ingest_records(records, batch_size=None, points_strategy=None, season=None):
+    """
+    Validate game records and import the valid ones in batches of `batch_size`, each
+    committed on its own through the CSV import engine.
+
+    Returns the totals and one result per record, in order: `imported`, or `error` with
+    a message for records that failed validation or whose batch could not be written.
+    """
+    results = []
+    rows = []
+    row_results = []
+    for index, record in enumerate(records):
+        try:
+            rows.append(record_to_row(record))
+        except InvalidRecord as e:
+            results.append({"index": index, "status": "error", "error": str(e)})
+        else:
+            result = {"index": index, "status": "imported"}
+            results.append(result)
+            row_results.append(result)
+
+    importer = GameImporter(
+        points_strategy=points_strategy, batch_size=batch_size or settings.INGEST_BATCH_SIZE, season=season
+    )
+    committed = 0
+
+    def checkpoint(batch_rows):
+        nonlocal committed
+        committed += batch_rows
+
+    try:
+        importer.import_checkpointed(rows, checkpoint)
+    except Exception as e:
+        for result in row_results[committed:]:
+            result.update(status="error", error=f"Not imported: {e}")
+
+    return {
+        "imported": committed,
+        "updated": importer.games_updated,
+        "errors": len(results) - committed,
+        "results": results,
+    }
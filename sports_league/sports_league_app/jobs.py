@@ -0,0 +1,207 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+
+from sports_league_app.importers import DEFAULT_BATCH_SIZE, CSVStreamReader, GameImporter, content_hash
+from sports_league_app.models import Game, ImportJob, RatingsState, Team, UploadBatch, ratings_marked_stale
+from sports_league_app.ratings import RATING_CHUNK_SIZE
+from sports_league_app.standings import rollback_upload_batch
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class ImportJobTakenOver(Exception):
+    """
+    Raised when another worker took over a job this worker was still running.
+    """
+
+
+def enqueue_import(uploaded_file, file_hash=None, season=None):
+    """
+    Store an uploaded CSV file as a queued import job.
+
+    Local workers are woken once the surrounding transaction commits, so the job row and
+    its file are visible to them.
+    """
+    upload_batch = UploadBatch.objects.create(
+        file_name=uploaded_file.name, content_hash=file_hash or content_hash(uploaded_file.chunks()), season=season
+    )
+    job = ImportJob.objects.create(file=uploaded_file, file_size=uploaded_file.size, upload_batch=upload_batch)
+    transaction.on_commit(wake_workers)
+    return job
+
+
+def find_imported_batch(file_hash):
+    """
+    Return the upload batch that imported, or is importing, the file with `file_hash`.
+
+    The batch of an import job that failed does not count: the rows it committed are
+    rolled back and None is returned, so the file can be imported again.
+    """
+    upload_batch = UploadBatch.objects.filter(content_hash=file_hash).select_related("import_job").first()
+    if upload_batch is None:
+        return None
+    job = getattr(upload_batch, "import_job", None)
+    if job is not None and job.status == ImportJob.Status.FAILED:
+        rollback_upload_batch(upload_batch)
+        return None
+    return upload_batch
+
+
+def wake_workers():
+    global _executor
+    workers = settings.IMPORT_JOB_WORKERS
+    if not workers:
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-job")
+    _executor.submit(run_pending_jobs, close_connection=True)
+
+
+@receiver(ratings_marked_stale)
+def schedule_ratings_rebuild(sender, **kwargs):
+    wake_workers()
+
+
+def claim_next_job():
+    """
+    Take the oldest queued job off the queue, or return None when it is empty.
+
+    A running job without a committed batch for IMPORT_JOB_STALE_AFTER seconds was left
+    by a worker that died, it is claimed again and carries on from its byte offset.
+    """
+    now = timezone.now()
+    claimable = Q(status=ImportJob.Status.QUEUED) | Q(
+        status=ImportJob.Status.RUNNING, heartbeat_at__lt=now - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER)
+    )
+    with transaction.atomic():
+        queued = ImportJob.objects.filter(claimable).order_by("pk")
+        if connection.features.has_select_for_update_skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        job = queued.first()
+        if job is None:
+            return None
+        # Without SKIP LOCKED two workers may read the same row, only one of them wins the update.
+        started_at = job.started_at or now
+        claimed = ImportJob.objects.filter(claimable, pk=job.pk).update(
+            status=ImportJob.Status.RUNNING, started_at=started_at, heartbeat_at=now
+        )
+        if not claimed:
+            return None
+    if job.status == ImportJob.Status.RUNNING:
+        logger.warning("Import job %s was abandoned, resuming it from byte %s", job.pk, job.byte_offset)
+    job.status = ImportJob.Status.RUNNING
+    job.started_at = started_at
+    job.heartbeat_at = now
+    return job
+
+
+def read_chunks(source, chunk_size=File.DEFAULT_CHUNK_SIZE):
+    return iter(partial(source.read, chunk_size), b"")
+
+
+def run_import_job(job, points_strategy=None, batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+    """
+    Import the job's file from its last checkpoint.
+
+    Every batch is committed together with the job's row count, byte offset and
+    heartbeat, so a job interrupted by a crash carries on from the end of its last
+    committed batch. `on_batch(job)` is called with the updated counters of every batch.
+    """
+    upload_batch = job.upload_batch
+    if upload_batch is not None and upload_batch.started_at is None:
+        upload_batch.started_at = job.started_at or timezone.now()
+        upload_batch.save(update_fields=["started_at"])
+    importer = GameImporter(
+        points_strategy=points_strategy,
+        batch_size=batch_size,
+        upload_batch=upload_batch,
+        season=upload_batch.season if upload_batch is not None else None,
+    )
+
+    reader = None
+
+    def checkpoint(batch_rows):
+        heartbeat_at = timezone.now()
+        # A job whose heartbeat moved on was claimed again by another worker, the batch
+        # is rolled back and this worker stops.
+        saved = ImportJob.objects.filter(pk=job.pk, heartbeat_at=job.heartbeat_at).update(
+            rows_processed=job.rows_processed + batch_rows,
+            byte_offset=reader.byte_offset,
+            heartbeat_at=heartbeat_at,
+        )
+        if not saved:
+            raise ImportJobTakenOver(f"Import job {job.pk} was taken over by another worker")
+        job.rows_processed += batch_rows
+        job.byte_offset = reader.byte_offset
+        job.heartbeat_at = heartbeat_at
+        if on_batch is not None:
+            on_batch(job)
+
+    try:
+        # A missing or unreadable file fails the job like a bad row does.
+        with job.open_source() as source:
+            source.seek(job.byte_offset)
+            reader = CSVStreamReader(read_chunks(source), skip_header=not job.byte_offset, byte_offset=job.byte_offset)
+            importer.import_checkpointed(reader, checkpoint)
+    except ImportJobTakenOver:
+        logger.warning("Import job %s was taken over by another worker", job.pk)
+        return job
+    except Exception as e:
+        logger.exception("Import job %s failed", job.pk)
+        job.status = ImportJob.Status.FAILED
+        job.error = str(e)
+    else:
+        job.status = ImportJob.Status.DONE
+        job.error = ""
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    if upload_batch is not None and job.status == ImportJob.Status.DONE:
+        upload_batch.finish(job.rows_processed)
+    return job
+
+
+def rebuild_stale_ratings(chunk_size=RATING_CHUNK_SIZE):
+    """
+    Replay the ratings if a change to past games left them out of date and return the
+    number of games replayed.
+    """
+    state = RatingsState.objects.filter(stale=True).first()
+    if state is None:
+        return 0
+    played = Team.objects.rebuild_ratings(Game.objects.all(), chunk_size=chunk_size)
+    # A change made during the replay bumped the version, it keeps the ratings stale.
+    RatingsState.objects.filter(pk=state.pk, version=state.version).update(stale=False)
+    return played
+
+
+def run_pending_jobs(close_connection=False):
+    """
+    Run queued jobs until the queue is empty and return how many were processed, then
+    replay the ratings if they are out of date.
+    """
+    processed = 0
+    try:
+        while (job := claim_next_job()) is not None:
+            try:
+                run_import_job(job)
+            except Exception:
+                # The job stays running until it goes stale and is retried, the queue moves on.
+                logger.exception("Import job %s could not be run", job.pk)
+            processed += 1
+        rebuild_stale_ratings()
+    finally:
+        if close_connection:
+            connection.close()
+    return processed
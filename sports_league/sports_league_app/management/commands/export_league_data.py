@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from sports_league_app.exporters import EXPORT_CHUNK_SIZE, EXPORT_DATASETS, EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = "Stream the games or the current standings, of all seasons or one, as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=list(EXPORT_DATASETS))
+        parser.add_argument("--format", dest="export_format", choices=list(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write to instead of stdout.")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--season", type=int, help="Id of the season to export, all seasons by default.")
+
+    def handle(self, *args, **options):
+        lines = export_lines(options["dataset"], options["export_format"], options["chunk_size"], options["season"])
+        if options["output"] is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w", newline="", encoding="utf-8") as output:
+            output.writelines(lines)
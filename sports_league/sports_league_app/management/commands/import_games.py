@@ -0,0 +1,128 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from sports_league_app.importers import DEFAULT_BATCH_SIZE, content_hash
+from sports_league_app.jobs import find_imported_batch, read_chunks, run_import_job
+from sports_league_app.models import ImportJob, Season, UploadBatch
+from sports_league_app.standings import rollback_upload_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Import games from a CSV file on disk. Every batch is committed with a checkpoint, "
+        "running the command again on the same file resumes from the last checkpoint. "
+        "Files that were already imported are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with `team_1 name, team_1 score, team_2 name, team_2 score` rows.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows committed per batch.")
+        parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start from the top.")
+        parser.add_argument("--season", type=int, help="Id of the season the games belong to.")
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        if not os.path.isfile(path):
+            raise CommandError(f"{path} does not exist.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive number.")
+
+        season = None
+        if options["season"] is not None:
+            season = Season.objects.filter(pk=options["season"]).first()
+            if season is None:
+                raise CommandError(f"Season {options['season']} does not exist.")
+
+        job = self.get_job(path, restart=options["restart"], season=season)
+        if job is None:
+            return
+
+        started = time.monotonic()
+        resumed_rows = job.rows_processed
+
+        def report(job):
+            rows = job.rows_processed - resumed_rows
+            elapsed = time.monotonic() - started
+            rate = rows / elapsed if elapsed > 0 else 0.0
+            self.stdout.write(
+                f"{job.rows_processed} rows imported ({job.byte_offset}/{job.file_size} bytes, {rate:.0f} rows/sec)"
+            )
+
+        run_import_job(job, batch_size=options["batch_size"], on_batch=report)
+        if job.status == ImportJob.Status.RUNNING:
+            raise CommandError(
+                f"Import job {job.pk} was taken over by another worker after {job.rows_processed} rows."
+            )
+        if job.status == ImportJob.Status.FAILED:
+            raise CommandError(
+                f"Import failed after {job.rows_processed} rows: {job.error}. Run the command again to resume."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Imported {job.rows_processed - resumed_rows} rows from {path}."))
+
+    def get_job(self, path, restart=False, season=None):
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as source:
+            file_hash = content_hash(read_chunks(source))
+        # A job whose batch was rolled back, after it failed and the file was imported again, can't be resumed.
+        job = (
+            ImportJob.objects.filter(source_path=path, upload_batch__isnull=False)
+            .exclude(status=ImportJob.Status.DONE)
+            .select_related("upload_batch")
+            .order_by("-pk")
+            .first()
+        )
+        if job is not None and not restart:
+            # The byte offset only points at the same rows in the same content.
+            if job.file_size == file_size and job.upload_batch.content_hash == file_hash:
+                self.stdout.write(f"Resuming from row {job.rows_processed} (byte {job.byte_offset}).")
+                return self.take_job(job)
+            self.stdout.write(self.style.WARNING("File changed since the last checkpoint, starting over."))
+        if job is not None:
+            # Starting from the top again, take out the rows the superseded run committed.
+            rollback_upload_batch(job.upload_batch)
+            job.upload_batch = None
+            job.status = ImportJob.Status.FAILED
+            job.error = "Superseded by a new import of the same file."
+            job.save(update_fields=["upload_batch", "status", "error"])
+
+        previous_upload = find_imported_batch(file_hash)
+        if previous_upload is not None:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{path} was already imported on {previous_upload.created_at:%Y-%m-%d %H:%M}, skipped."
+                )
+            )
+            return None
+        upload_batch = UploadBatch.objects.create(
+            file_name=os.path.basename(path), content_hash=file_hash, season=season
+        )
+        # Created running with a heartbeat, so queue workers never claim it while it is imported here.
+        now = timezone.now()
+        return ImportJob.objects.create(
+            source_path=path,
+            file_size=file_size,
+            upload_batch=upload_batch,
+            status=ImportJob.Status.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+        )
+
+    def take_job(self, job):
+        """
+        Mark a job being resumed as running here, unless a queue worker claimed it since
+        it was read.
+        """
+        now = timezone.now()
+        started_at = job.started_at or now
+        taken = ImportJob.objects.filter(pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at).update(
+            status=ImportJob.Status.RUNNING, started_at=started_at, heartbeat_at=now
+        )
+        if not taken:
+            raise CommandError(f"Import job {job.pk} was claimed by another worker, try again later.")
+        job.status = ImportJob.Status.RUNNING
+        job.started_at = started_at
+        job.heartbeat_at = now
+        return job
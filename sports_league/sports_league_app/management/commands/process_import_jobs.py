@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sports_league_app.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued CSV import jobs from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to wait between queue polls.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending_jobs()
+            if processed:
+                self.stdout.write(f"Processed {processed} import job(s).")
+            if options["once"]:
+                return
+            time.sleep(options["poll_interval"])
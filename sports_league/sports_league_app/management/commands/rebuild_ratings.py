@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sports_league_app.jobs import rebuild_stale_ratings
+from sports_league_app.models import RatingsState
+from sports_league_app.ratings import RATING_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Rebuild every team's Elo rating by replaying all games in the order they were added."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=RATING_CHUNK_SIZE, help="Games read per query.")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive number.")
+        started = time.monotonic()
+        # Counts as a replay of stale ratings, so a full rebuild also clears the stale mark.
+        RatingsState.objects.mark_stale()
+        played = rebuild_stale_ratings(chunk_size=options["chunk_size"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings from {played} games in {elapsed:.1f}s."))
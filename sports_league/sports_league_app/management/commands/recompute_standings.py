@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sports_league_app.models import Season
+from sports_league_app.standings import recompute_season_standings, recompute_standings
+
+
+def recompute_season_in_thread(season):
+    try:
+        return recompute_season_standings(season)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Rebuild every team's wins, draws, loses and points from the games table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--season",
+            type=int,
+            action="append",
+            default=[],
+            help="Rebuild the standings rows of this season instead of the teams' totals, may be repeated.",
+        )
+        parser.add_argument("--workers", type=int, default=1, help="Seasons rebuilt at the same time.")
+
+    def handle(self, *args, **options):
+        if not options["season"]:
+            changed = recompute_standings()
+            self.stdout.write(self.style.SUCCESS(f"Recomputed standings, {len(changed)} team(s) corrected."))
+            return
+
+        seasons = Season.objects.in_bulk(options["season"])
+        missing = set(options["season"]) - seasons.keys()
+        if missing:
+            raise CommandError(f"Season(s) {', '.join(map(str, sorted(missing)))} do not exist.")
+        seasons = list(seasons.values())
+        if options["workers"] > 1:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                results = list(executor.map(recompute_season_in_thread, seasons))
+        else:
+            results = [recompute_season_standings(season) for season in seasons]
+        for season, changed in zip(seasons, results):
+            self.stdout.write(self.style.SUCCESS(f"Recomputed {season} standings, {len(changed)} row(s) corrected."))
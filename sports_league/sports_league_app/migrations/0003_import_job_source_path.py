@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0002_import_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="source_path",
+            field=models.CharField(blank=True, db_index=True, max_length=1000),
+        ),
+        migrations.AlterField(
+            model_name="importjob",
+            name="file",
+            field=models.FileField(blank=True, upload_to="imports/"),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0003_import_job_source_path"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="team",
+            index=models.Index(fields=["-points", "name"], name="team_ranking_idx"),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0004_team_ranking_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadBatch",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("file_name", models.CharField(max_length=255)),
+                ("content_hash", models.CharField(db_index=True, max_length=64)),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "upload batches",
+            },
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="upload_batch",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="games",
+                to="sports_league_app.uploadbatch",
+            ),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="upload_batch",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="import_job",
+                to="sports_league_app.uploadbatch",
+            ),
+        ),
+    ]
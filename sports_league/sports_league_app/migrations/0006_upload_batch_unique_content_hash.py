@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0005_upload_batch"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadbatch",
+            name="content_hash",
+            field=models.CharField(max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0006_upload_batch_unique_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="fixture_id",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0007_game_fixture_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="League",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=300, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Season",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=100)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "league",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seasons",
+                        to="sports_league_app.league",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="season",
+            constraint=models.UniqueConstraint(fields=("league", "name"), name="unique_season_per_league"),
+        ),
+        migrations.CreateModel(
+            name="TeamSeasonStanding",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("wins", models.IntegerField(default=0)),
+                ("draws", models.IntegerField(default=0)),
+                ("loses", models.IntegerField(default=0)),
+                ("points", models.IntegerField(default=0)),
+                (
+                    "season",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="standings",
+                        to="sports_league_app.season",
+                    ),
+                ),
+                (
+                    "team",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="season_standings",
+                        to="sports_league_app.team",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="teamseasonstanding",
+            index=models.Index(fields=["season", "-points"], name="season_ranking_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="teamseasonstanding",
+            constraint=models.UniqueConstraint(fields=("season", "team"), name="unique_team_per_season"),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="season",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="games",
+                to="sports_league_app.season",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(fields=["season", "-id"], name="game_season_idx"),
+        ),
+        migrations.AddField(
+            model_name="uploadbatch",
+            name="season",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="upload_batches",
+                to="sports_league_app.season",
+            ),
+        ),
+    ]
@@ -0,0 +1,110 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def goal_totals(games):
+    """
+    Return {(season_id, team_id): [goals_for, goals_against]} over `games`.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for team, opponent in (("first_team", "second_team"), ("second_team", "first_team")):
+        rows = (
+            games.order_by()
+            .values("season", team=F(team))
+            .annotate(goals_for=Sum(f"{team}_score"), goals_against=Sum(f"{opponent}_score"))
+        )
+        for row in rows:
+            total = totals[(row["season"], row["team"])]
+            total[0] += row["goals_for"]
+            total[1] += row["goals_against"]
+    return totals
+
+
+def set_goals(rows, totals):
+    for row in rows:
+        row.goals_for, row.goals_against = totals.get(row.key, (0, 0))
+        row.goal_difference = row.goals_for - row.goals_against
+    return rows
+
+
+def backfill_goals(apps, schema_editor):
+    Game = apps.get_model("sports_league_app", "Game")
+    Team = apps.get_model("sports_league_app", "Team")
+    TeamSeasonStanding = apps.get_model("sports_league_app", "TeamSeasonStanding")
+    fields = ["goals_for", "goals_against", "goal_difference"]
+
+    season_totals = goal_totals(Game.objects.all())
+    team_totals = defaultdict(lambda: [0, 0])
+    for (_, team_id), (goals_for, goals_against) in season_totals.items():
+        team_totals[team_id][0] += goals_for
+        team_totals[team_id][1] += goals_against
+
+    teams = list(Team.objects.only("pk"))
+    for team in teams:
+        team.key = team.pk
+    Team.objects.bulk_update(set_goals(teams, team_totals), fields, batch_size=1000)
+
+    standings = list(TeamSeasonStanding.objects.only("season", "team"))
+    for standing in standings:
+        standing.key = (standing.season_id, standing.team_id)
+    TeamSeasonStanding.objects.bulk_update(set_goals(standings, season_totals), fields, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0008_league_season"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="goals_for",
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="goals_against",
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="goal_difference",
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name="teamseasonstanding",
+            name="goals_for",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="teamseasonstanding",
+            name="goals_against",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="teamseasonstanding",
+            name="goal_difference",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RemoveIndex(
+            model_name="team",
+            name="team_ranking_idx",
+        ),
+        migrations.AddIndex(
+            model_name="team",
+            index=models.Index(fields=["-points", "-goal_difference", "-goals_for", "name"], name="team_ranking_idx"),
+        ),
+        migrations.RemoveIndex(
+            model_name="teamseasonstanding",
+            name="season_ranking_idx",
+        ),
+        migrations.AddIndex(
+            model_name="teamseasonstanding",
+            index=models.Index(
+                fields=["season", "-points", "-goal_difference", "-goals_for"], name="season_ranking_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_goals, migrations.RunPython.noop),
+    ]
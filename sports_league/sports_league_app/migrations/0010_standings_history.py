@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0009_standings_goals"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StandingsSnapshot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("round", models.PositiveIntegerField()),
+                ("position", models.PositiveIntegerField()),
+                ("wins", models.IntegerField(default=0)),
+                ("draws", models.IntegerField(default=0)),
+                ("loses", models.IntegerField(default=0)),
+                ("goals_for", models.IntegerField(default=0)),
+                ("goals_against", models.IntegerField(default=0)),
+                ("goal_difference", models.IntegerField(default=0)),
+                ("points", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="round",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="season",
+            name="history_stale_from",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(fields=["season", "round"], name="game_round_idx"),
+        ),
+        migrations.AddField(
+            model_name="standingssnapshot",
+            name="season",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name="snapshots", to="sports_league_app.season"
+            ),
+        ),
+        migrations.AddField(
+            model_name="standingssnapshot",
+            name="team",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name="snapshots", to="sports_league_app.team"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="standingssnapshot",
+            index=models.Index(fields=["season", "round", "position"], name="snapshot_table_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="standingssnapshot",
+            constraint=models.UniqueConstraint(fields=("season", "team", "round"), name="unique_team_per_round"),
+        ),
+    ]
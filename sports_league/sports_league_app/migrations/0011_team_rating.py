@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+import sports_league_app.ratings
+
+# The Elo settings the ratings were introduced with, kept here so the migration does not
+# change with the app code.
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+
+
+def rate_existing_games(apps, schema_editor):
+    Game = apps.get_model("sports_league_app", "Game")
+    Team = apps.get_model("sports_league_app", "Team")
+
+    ratings = dict.fromkeys(Team.objects.values_list("pk", flat=True), INITIAL_RATING)
+    games = Game.objects.order_by("pk").values_list(
+        "first_team", "first_team_score", "second_team", "second_team_score"
+    )
+    for first_team, first_team_score, second_team, second_team_score in games.iterator(chunk_size=2000):
+        if first_team_score == second_team_score:
+            score = 0.5
+        else:
+            score = 1.0 if first_team_score > second_team_score else 0.0
+        expected = 1 / (1 + 10 ** ((ratings[second_team] - ratings[first_team]) / 400))
+        change = K_FACTOR * (score - expected)
+        ratings[first_team] += change
+        ratings[second_team] -= change
+    Team.objects.bulk_update(
+        [Team(pk=team_id, rating=rating) for team_id, rating in ratings.items()], ["rating"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0010_standings_history"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="rating",
+            field=models.FloatField(default=sports_league_app.ratings.initial_rating),
+        ),
+        migrations.RunPython(rate_existing_games, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+def create_ratings_state(apps, schema_editor):
+    apps.get_model("sports_league_app", "RatingsState").objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0011_team_rating"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RatingsState",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("stale", models.BooleanField(default=False)),
+                ("version", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_ratings_state, migrations.RunPython.noop),
+    ]
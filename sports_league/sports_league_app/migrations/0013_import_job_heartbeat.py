@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:58
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_heartbeats(apps, schema_editor):
+    # Jobs already running count from their start, so the ones left by dead workers get picked up.
+    ImportJob = apps.get_model("sports_league_app", "ImportJob")
+    ImportJob.objects.filter(status="running").update(heartbeat_at=F("started_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sports_league_app", "0012_ratingsstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_heartbeats, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,118 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import F, Window
+from django.db.models.functions import Coalesce, Least, Rank
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from sports_league_app.strategy import DefaultPointsCalculation
+from sports_league_app.cache import adjust_games_count, bump_standings_version
+from sports_league_app.ratings import RATING_CHUNK_SIZE, RatingTable, initial_rating
+from sports_league_app.strategy import GAME_RESULT_FIELDS, STANDINGS_FIELDS, DefaultPointsCalculation
 
 # Create your models here.
 
 
+class RankedQuerySet(models.QuerySet):
+    # Last tie breaker of the ranking order.
+    name_field = "name"
+
+    def ranked(self, points_strategy=None):
+        """
+        Teams in ranking order, annotated with their competition rank ("1224"): teams level
+        on points share a rank. Level teams are listed by goal difference, then goals scored,
+        then name, the order of the ranking index.
+
+        With a `points_strategy` the teams are ranked on the points it gives them, computed
+        by the database and annotated as `scheme_points`, instead of the stored ones.
+        """
+        if points_strategy is None:
+            return self.annotate(rank=Window(expression=Rank(), order_by=F("points").desc())).order_by(
+                "-points", "-goal_difference", "-goals_for", self.name_field
+            )
+        return (
+            self.annotate(scheme_points=points_strategy.points_expression())
+            .annotate(rank=Window(expression=Rank(), order_by=F("scheme_points").desc()))
+            .order_by("-scheme_points", "-goal_difference", "-goals_for", self.name_field)
+        )
+
+    def rank_of(self, team, points_strategy=None):
+        if points_strategy is None:
+            return self.filter(points__gt=team.points).count() + 1
+        points = points_strategy.calculate_points(team)
+        return (
+            self.alias(scheme_points=points_strategy.points_expression()).filter(scheme_points__gt=points).count() + 1
+        )
+
+
+class TeamQuerySet(RankedQuerySet):
+    def rate_games(self, games):
+        """
+        Update the Elo ratings of the teams of `games`, new games in the order they were
+        played, with one read and one bulk update whatever the number of games.
+        """
+        team_ids = {team_id for game in games for team_id in (game.first_team_id, game.second_team_id)}
+        if not team_ids:
+            return
+        ratings = dict(self.select_for_update().filter(pk__in=team_ids).values_list("pk", "rating"))
+        table = RatingTable(ratings)
+        for game in games:
+            table.play(game.first_team_id, game.first_team_score, game.second_team_id, game.second_team_score)
+        self.bulk_update([Team(pk=team_id, rating=rating) for team_id, rating in table.items()], ["rating"])
+
+    def rebuild_ratings(self, games, chunk_size=RATING_CHUNK_SIZE):
+        """
+        Replay `games` in the order they were added and write the resulting Elo rating of
+        every team. Returns the number of games replayed.
+
+        Games are streamed `chunk_size` rows at a time as plain tuples and the ratings kept
+        in a RatingTable, so memory use does not depend on the number of games. The replay
+        holds no locks: only the games added while it ran are played again with the teams
+        locked, right before the ratings are written.
+        """
+        table = RatingTable(dict.fromkeys(self.order_by("pk").values_list("pk", flat=True), initial_rating()))
+        played, last_game = self.replay(table, games, chunk_size=chunk_size)
+        with transaction.atomic():
+            for team_id in self.select_for_update().order_by("pk").values_list("pk", flat=True):
+                table.add(team_id, initial_rating())
+            caught_up, _ = self.replay(table, games.filter(pk__gt=last_game), chunk_size=chunk_size)
+            self.bulk_update(
+                [Team(pk=team_id, rating=rating) for team_id, rating in table.items()], ["rating"], batch_size=1000
+            )
+        return played + caught_up
+
+    def replay(self, table, games, chunk_size=RATING_CHUNK_SIZE):
+        """
+        Play `games` on a RatingTable in the order they were added, return how many were
+        played and the id of the last one.
+        """
+        played, last_game = 0, 0
+        for last_game, *result in games.order_by("pk").values_list("pk", *GAME_RESULT_FIELDS).iterator(chunk_size):
+            table.play(*result)
+            played += 1
+        return played, last_game
+
+
 class Team(models.Model):
     name = models.CharField(max_length=300, verbose_name=_("Team Name"), null=False, blank=False, unique=True)
     wins = models.IntegerField(default=0, null=True, blank=True)
     draws = models.IntegerField(default=0, null=True, blank=True)
     loses = models.IntegerField(default=0, null=True, blank=True)
+    goals_for = models.IntegerField(default=0, null=True, blank=True)
+    goals_against = models.IntegerField(default=0, null=True, blank=True)
+    goal_difference = models.IntegerField(default=0, null=True, blank=True)
     points = models.IntegerField(default=0, null=True, blank=True)
+    # Elo rating over all games, in the order they were added.
+    rating = models.FloatField(default=initial_rating)
+
+    objects = TeamQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-points", "-goal_difference", "-goals_for", "name"], name="team_ranking_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -27,6 +127,215 @@ class Team(models.Model):
 
         self.points = points_strategy.calculate_points(self)
         super(Team, self).save()
+        bump_standings_version()
+
+    def delete(self, *args, **kwargs):
+        bump_standings_version()
+        return super().delete(*args, **kwargs)
+
+
+class League(models.Model):
+    name = models.CharField(max_length=300, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SeasonQuerySet(models.QuerySet):
+    def invalidate_history(self, rounds):
+        """
+        Mark the standings snapshots out of date from the earliest round of each season in
+        an iterable of (season_id, round) pairs; pairs without a season or round are skipped.
+        """
+        first_rounds = {}
+        for season_id, round_number in rounds:
+            if season_id is not None and round_number is not None:
+                first_rounds[season_id] = min(first_rounds.get(season_id, round_number), round_number)
+        for season_id, round_number in first_rounds.items():
+            self.filter(pk=season_id).update(
+                history_stale_from=Least(Coalesce("history_stale_from", round_number), round_number)
+            )
+
+
+class Season(models.Model):
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name="seasons")
+    name = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # First round whose standings snapshots no longer match the games, None when they are all current.
+    history_stale_from = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = SeasonQuerySet.as_manager()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["league", "name"], name="unique_season_per_league")]
+
+    def __str__(self):
+        return f"{self.league} {self.name}"
+
+
+class TeamSeasonStandingQuerySet(RankedQuerySet):
+    name_field = "team__name"
+
+    def ranked(self, points_strategy=None):
+        return super().ranked(points_strategy).annotate(name=F("team__name"))
+
+    def apply_deltas(self, season_id, deltas, points_strategy=None):
+        """
+        Apply a {team_id: StandingsDelta} mapping to the standings rows of a season, creating
+        the missing ones, with one insert, one read and one bulk update.
+        """
+        if points_strategy is None:
+            points_strategy = DefaultPointsCalculation()
+
+        team_ids = [team_id for team_id, delta in deltas.items() if delta]
+        if not team_ids:
+            return []
+
+        self.bulk_create(
+            [TeamSeasonStanding(season_id=season_id, team_id=team_id) for team_id in team_ids], ignore_conflicts=True
+        )
+        standings = list(self.select_for_update().filter(season_id=season_id, team__in=team_ids))
+        for standing in standings:
+            deltas[standing.team_id].apply_to(standing)
+            standing.points = points_strategy.calculate_points(standing)
+        self.bulk_update(standings, STANDINGS_FIELDS)
+        bump_standings_version()
+        return standings
+
+    def apply_games(self, games, sign=1, points_strategy=None):
+        """
+        Add (`sign=1`) or remove (`sign=-1`) a list of games from the standings of their
+        seasons.
+        """
+        if points_strategy is None:
+            points_strategy = DefaultPointsCalculation()
+
+        games_by_season = defaultdict(list)
+        for game in games:
+            if game.season_id is not None:
+                games_by_season[game.season_id].append(game)
+        for season_id, season_games in games_by_season.items():
+            self.apply_deltas(season_id, points_strategy.apply_games(season_games, sign), points_strategy)
+
+
+class TeamSeasonStanding(models.Model):
+    """
+    A team's standings within one season; Team holds the totals over all seasons.
+    """
+
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="standings")
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="season_standings")
+    wins = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    loses = models.IntegerField(default=0)
+    goals_for = models.IntegerField(default=0)
+    goals_against = models.IntegerField(default=0)
+    goal_difference = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+
+    objects = TeamSeasonStandingQuerySet.as_manager()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["season", "team"], name="unique_team_per_season")]
+        indexes = [
+            models.Index(fields=["season", "-points", "-goal_difference", "-goals_for"], name="season_ranking_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.team} in {self.season}"
+
+
+class StandingsSnapshot(models.Model):
+    """
+    The standings of a team within a season after a round, kept for every round of the
+    season up to its last one so the table after any round is a single indexed read.
+    """
+
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="snapshots")
+    round = models.PositiveIntegerField()
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="snapshots")
+    position = models.PositiveIntegerField()
+    wins = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    loses = models.IntegerField(default=0)
+    goals_for = models.IntegerField(default=0)
+    goals_against = models.IntegerField(default=0)
+    goal_difference = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["season", "team", "round"], name="unique_team_per_round")]
+        indexes = [models.Index(fields=["season", "round", "position"], name="snapshot_table_idx")]
+
+    def __str__(self):
+        return f"{self.team} after round {self.round} of {self.season}"
+
+
+# Sent once a transaction that marked the ratings stale commits, the import job workers
+# replay them.
+ratings_marked_stale = Signal()
+
+
+class RatingsStateQuerySet(models.QuerySet):
+    def mark_stale(self):
+        """
+        Record that past games changed and have the ratings replayed by
+        `rebuild_stale_ratings` once the transaction commits.
+        """
+        if not self.filter(pk=1).update(stale=True, version=F("version") + 1):
+            self.get_or_create(pk=1, defaults={"stale": True, "version": 1})
+        transaction.on_commit(lambda: ratings_marked_stale.send(sender=RatingsState))
+
+
+class RatingsState(models.Model):
+    """
+    Single row telling whether the team ratings are out of date.
+
+    New games update the ratings as they come in, but a change to a past game changes
+    every rating after it: it only marks the ratings stale, and they are replayed outside
+    of the request by the import job workers, woken on commit, or `manage.py
+    rebuild_ratings`. Each change
+    bumps `version`, a replay only clears `stale` when no other change came in meanwhile.
+    """
+
+    stale = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=0)
+
+    objects = RatingsStateQuerySet.as_manager()
+
+
+class UploadBatch(models.Model):
+    file_name = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, unique=True)
+    row_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    season = models.ForeignKey(Season, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload_batches")
+
+    class Meta:
+        verbose_name_plural = "upload batches"
+
+    def __str__(self):
+        return self.file_name
+
+    def finish(self, row_count):
+        self.row_count = row_count
+        self.finished_at = timezone.now()
+        self.save(update_fields=["row_count", "finished_at"])
+
+    @property
+    def duration(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def rows_per_second(self):
+        duration = self.duration
+        if not duration:
+            return None
+        return self.row_count / duration.total_seconds()
 
 
 class Game(models.Model):
@@ -34,10 +343,31 @@ class Game(models.Model):
     first_team_score = models.PositiveIntegerField()
     second_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="second_team_results")
     second_team_score = models.PositiveIntegerField()
+    upload_batch = models.ForeignKey(
+        UploadBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name="games"
+    )
+    # Identifier of the fixture in the results feed, resent rows update the game instead of adding one.
+    fixture_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, null=True, blank=True, related_name="games")
+    # Matchday of the game within its season, games without one are left out of the standings history.
+    round = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["season", "-id"], name="game_season_idx"),
+            models.Index(fields=["season", "round"], name="game_round_idx"),
+        ]
 
     def __str__(self):
         return f"{self.first_team} vs {self.second_team}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        game = super().from_db(db, field_names, values)
+        # Where the game stood when loaded, a save that moves it invalidates the history there too.
+        game._loaded_round = (game.__dict__.get("season_id"), game.__dict__.get("round"))
+        return game
+
     def is_draw(self) -> bool:
         return self.first_team_score == self.second_team_score
 
@@ -70,7 +400,13 @@ class Game(models.Model):
         if points_strategy is None:
             points_strategy = DefaultPointsCalculation()
         points_strategy.update_teams(self, delete=True)
+        TeamSeasonStanding.objects.apply_games([self], sign=-1, points_strategy=points_strategy)
+        Season.objects.invalidate_history([(self.season_id, self.round)])
         super().delete(*args, **kwargs)
+        # The ratings after this game depend on it, they are replayed later without it.
+        RatingsState.objects.mark_stale()
+        adjust_games_count(-1)
+        bump_standings_version()
 
     def save(self, *args, **kwargs):
         created = not self.pk
@@ -80,3 +416,60 @@ class Game(models.Model):
             points_strategy = DefaultPointsCalculation()
         if created:
             points_strategy.update_teams(self)
+            TeamSeasonStanding.objects.apply_games([self], points_strategy=points_strategy)
+            Team.objects.rate_games([self])
+            adjust_games_count(1)
+        Season.objects.invalidate_history([getattr(self, "_loaded_round", (None, None)), (self.season_id, self.round)])
+        self._loaded_round = (self.season_id, self.round)
+        bump_standings_version()
+
+
+class ImportJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "queued", _("Queued")
+        RUNNING = "running", _("Running")
+        DONE = "done", _("Done")
+        FAILED = "failed", _("Failed")
+
+    file = models.FileField(upload_to="imports/", blank=True)
+    upload_batch = models.OneToOneField(
+        UploadBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name="import_job"
+    )
+    source_path = models.CharField(max_length=1000, blank=True, db_index=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    byte_offset = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed with every committed batch, a running job that stops beating was left by
+    # a dead worker.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import of {self.source_path or self.file.name} ({self.status})"
+
+    def open_source(self):
+        if self.source_path:
+            return open(self.source_path, "rb")
+        return self.file.open("rb")
+
+    @property
+    def rows_per_second(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else 0.0
+
+    def progress(self):
+        return {
+            "id": self.pk,
+            "status": self.status,
+            "rows_processed": self.rows_processed,
+            "bytes_processed": self.byte_offset,
+            "file_size": self.file_size,
+            "rows_per_second": round(self.rows_per_second, 1),
+            "error": self.error,
+        }
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+from sports_league_app.cache import get_cached_games_count, set_cached_games_count
+
+
+def estimated_row_count(model):
+    """
+    Return the query planner's row estimate for `model`'s table on PostgreSQL, or None.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    # Tables that were never vacuumed or analyzed report -1.
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator over the whole Game table that reads the row count from the cache.
+
+    The cached count is kept up to date by game creation, deletion and imports. On a cold
+    cache `GAMES_LIST_COUNT = "estimated"` uses the PostgreSQL planner estimate, otherwise
+    the table is counted once and the result cached. A filtered queryset, such as the
+    games of one season, is always counted.
+    """
+
+    @cached_property
+    def count(self):
+        if self.object_list.query.has_filters():
+            return super().count
+        count = get_cached_games_count()
+        if count is not None:
+            return count
+        if settings.GAMES_LIST_COUNT == "estimated":
+            count = estimated_row_count(self.object_list.model)
+            if count is not None:
+                return count
+        count = super().count
+        set_cached_games_count(count)
+        return count
+
+
+class KeysetPage:
+    """
+    A page of rows fetched with `WHERE pk < cursor ORDER BY pk DESC LIMIT n`, which costs
+    the same however deep into the table it is.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset_paginate(queryset, page_size, after=None, before=None):
+    """
+    Return the page of `queryset` (newest first) following the `after` cursor, or
+    preceding the `before` cursor.
+    """
+    if before is not None:
+        rows = list(queryset.filter(pk__gt=before).order_by("pk")[: page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=rows[-1].pk if rows else None,
+            previous_cursor=rows[0].pk if has_previous else None,
+        )
+
+    if after is not None:
+        queryset = queryset.filter(pk__lt=after)
+    rows = list(queryset.order_by("-pk")[: page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(
+        rows,
+        next_cursor=rows[-1].pk if has_next else None,
+        previous_cursor=rows[0].pk if after is not None and rows else None,
+    )
@@ -0,0 +1,64 @@
+from array import array
+
+from django.conf import settings
+
+# Games read per round trip by a full rebuild.
+RATING_CHUNK_SIZE = 2000
+
+
+def initial_rating():
+    return settings.ELO_INITIAL_RATING
+
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def result_score(first_team_score, second_team_score):
+    """
+    Return the first team's Elo score for a result: 1 for a win, 0.5 for a draw, 0 for a loss.
+    """
+    if first_team_score == second_team_score:
+        return 0.5
+    return 1.0 if first_team_score > second_team_score else 0.0
+
+
+def rated_result(game):
+    """
+    Return what the Elo ratings take from a game: its teams and the first team's score.
+    """
+    return game.first_team_id, game.second_team_id, result_score(game.first_team_score, game.second_team_score)
+
+
+class RatingTable:
+    """
+    Elo ratings of a set of teams, held in a compact array of floats indexed by team.
+
+    `play` applies one game: the first team gains K * (score - expected score) and the
+    second team loses as much, so each game is a constant amount of work.
+    """
+
+    def __init__(self, ratings, k_factor=None):
+        self.index = {team_id: position for position, team_id in enumerate(ratings)}
+        self.ratings = array("d", ratings.values())
+        self.k_factor = settings.ELO_K_FACTOR if k_factor is None else k_factor
+
+    def add(self, team_id, rating):
+        """
+        Add a team at `rating` unless it is already in the table.
+        """
+        if team_id not in self.index:
+            self.index[team_id] = len(self.ratings)
+            self.ratings.append(rating)
+
+    def play(self, first_team_id, first_team_score, second_team_id, second_team_score):
+        first, second = self.index[first_team_id], self.index[second_team_id]
+        first_rating, second_rating = self.ratings[first], self.ratings[second]
+        change = self.k_factor * (
+            result_score(first_team_score, second_team_score) - expected_score(first_rating, second_rating)
+        )
+        self.ratings[first] = first_rating + change
+        self.ratings[second] = second_rating - change
+
+    def items(self):
+        return zip(self.index, self.ratings)
@@ -0,0 +1,255 @@
+from django.db import transaction
+from django.db.models import F, Q
+
+from sports_league_app.cache import adjust_games_count, bump_standings_version, get_or_compute
+from sports_league_app.models import Game, RatingsState, Season, Team, TeamSeasonStanding
+from sports_league_app.strategy import (
+    DEFAULT_SCHEME,
+    STANDINGS_FIELDS,
+    DefaultPointsCalculation,
+    StandingsDelta,
+    get_points_strategy,
+    merge_deltas,
+    new_deltas,
+)
+from sports_league_app.tiebreakers import break_ties, team_record
+
+# Fields read for the ranking rows, the tiebreakers take the overall records from them.
+RANKING_FIELDS = ["wins", "draws", "loses", "goals_for", "goals_against", "points"]
+
+
+def apply_team_deltas(deltas, points_strategy=None):
+    """
+    Apply a {team_id: StandingsDelta} mapping with one read and one bulk update.
+    """
+    if points_strategy is None:
+        points_strategy = DefaultPointsCalculation()
+
+    team_ids = [team_id for team_id, delta in deltas.items() if delta]
+    if not team_ids:
+        return []
+
+    teams = list(Team.objects.select_for_update().filter(pk__in=team_ids))
+    for team in teams:
+        deltas[team.pk].apply_to(team)
+        team.points = points_strategy.calculate_points(team)
+    Team.objects.bulk_update(teams, STANDINGS_FIELDS)
+    bump_standings_version()
+    return teams
+
+
+def apply_season_deltas(season_deltas, points_strategy=None):
+    """
+    Apply a {season_id: {team_id: StandingsDelta}} mapping to the seasons' standings rows
+    and its sum to the teams' totals.
+    """
+    totals = new_deltas()
+    for season_id, deltas in season_deltas.items():
+        merge_deltas(totals, deltas)
+        if season_id is not None:
+            TeamSeasonStanding.objects.apply_deltas(season_id, deltas, points_strategy)
+    return apply_team_deltas(totals, points_strategy)
+
+
+def season_game_deltas(games, sign=1, points_strategy=None):
+    """
+    Return the {season_id: {team_id: StandingsDelta}} change of a queryset of games, with
+    one `apply_games` call per season the games span.
+    """
+    if points_strategy is None:
+        points_strategy = DefaultPointsCalculation()
+
+    season_ids = games.order_by().values_list("season", flat=True).distinct()
+    return {season_id: points_strategy.apply_games(games.filter(season=season_id), sign) for season_id in season_ids}
+
+
+def bulk_delete_games(games, points_strategy=None):
+    """
+    Delete every game in the `games` queryset and take them out of the standings.
+
+    The standings change of all affected teams comes from the strategy's `apply_games`
+    (one aggregate query per season by default) and is applied with one bulk update per
+    season, the games are removed with one DELETE.
+    """
+    with transaction.atomic():
+        apply_season_deltas(season_game_deltas(games, -1, points_strategy), points_strategy)
+        Season.objects.invalidate_history(games.order_by().values_list("season", "round").distinct())
+        deleted, _ = games.order_by().delete()
+        if deleted:
+            RatingsState.objects.mark_stale()
+        adjust_games_count(-deleted)
+    return deleted
+
+
+def rollback_upload_batch(upload_batch, points_strategy=None):
+    """
+    Remove an upload batch with all of its games and reverse their standings effect.
+    """
+    with transaction.atomic():
+        deleted = bulk_delete_games(upload_batch.games.all(), points_strategy)
+        upload_batch.delete()
+    return deleted
+
+
+def set_counters(row, result, points_strategy):
+    """
+    Overwrite the counters of a Team or TeamSeasonStanding row with the totals `result`.
+    """
+    row.wins, row.draws, row.loses = result.wins, result.draws, result.loses
+    row.goals_for, row.goals_against = result.goals_for, result.goals_against
+    row.goal_difference = result.goals_for - result.goals_against
+    row.points = points_strategy.calculate_points(row)
+
+
+def recompute_standings(teams=None, points_strategy=None):
+    """
+    Rebuild the standings of every team (or of `teams`) from the Game table.
+
+    Returns the teams whose stored standings were out of date; they are written back
+    with a single bulk update.
+    """
+    if points_strategy is None:
+        points_strategy = DefaultPointsCalculation()
+
+    with transaction.atomic():
+        team_queryset = Team.objects.select_for_update()
+        games = Game.objects.all()
+        if teams is not None:
+            teams = Team.objects.filter(pk__in=teams).values("pk")
+            team_queryset = team_queryset.filter(pk__in=teams)
+            games = games.filter(Q(first_team__in=teams) | Q(second_team__in=teams))
+        results = points_strategy.apply_games(games)
+
+        changed = []
+        for team in team_queryset:
+            result = results.get(team.pk, StandingsDelta())
+            before = [getattr(team, field) for field in STANDINGS_FIELDS]
+            set_counters(team, result, points_strategy)
+            if before != [getattr(team, field) for field in STANDINGS_FIELDS]:
+                changed.append(team)
+        Team.objects.bulk_update(changed, STANDINGS_FIELDS, batch_size=1000)
+        if changed:
+            bump_standings_version()
+    return changed
+
+
+def recompute_season_standings(season, points_strategy=None):
+    """
+    Rebuild the standings rows of one season from its games.
+
+    Only the season's rows are locked, so different seasons can be recomputed at the same
+    time. Returns the rows that were created or corrected.
+    """
+    if points_strategy is None:
+        points_strategy = DefaultPointsCalculation()
+
+    with transaction.atomic():
+        standings = {
+            standing.team_id: standing
+            for standing in TeamSeasonStanding.objects.select_for_update().filter(season=season)
+        }
+        results = points_strategy.apply_games(Game.objects.filter(season=season))
+
+        created = [TeamSeasonStanding(season=season, team_id=team_id) for team_id in results.keys() - standings.keys()]
+        changed = []
+        for standing in [*standings.values(), *created]:
+            result = results.get(standing.team_id, StandingsDelta())
+            before = [getattr(standing, field) for field in STANDINGS_FIELDS]
+            set_counters(standing, result, points_strategy)
+            if standing.pk is not None and before != [getattr(standing, field) for field in STANDINGS_FIELDS]:
+                changed.append(standing)
+        TeamSeasonStanding.objects.bulk_create(created, batch_size=1000)
+        TeamSeasonStanding.objects.bulk_update(changed, STANDINGS_FIELDS, batch_size=1000)
+        if created or changed:
+            bump_standings_version()
+    return created + changed
+
+
+def ranking_row(team, points=None):
+    return {"rank": team.rank, "name": team.name, "points": team.points if points is None else points}
+
+
+def ranking_rows(scheme=DEFAULT_SCHEME, season=None):
+    """
+    Return the ranked rows queryset, the games queryset and the points strategy of the
+    ranking under `scheme` over all seasons or within `season`.
+    """
+    points_strategy = None if scheme == DEFAULT_SCHEME else get_points_strategy(scheme)
+    if season is None:
+        rows = Team.objects.ranked(points_strategy).only("name", *RANKING_FIELDS)
+        games = Game.objects.all()
+    else:
+        rows = TeamSeasonStanding.objects.filter(season=season).ranked(points_strategy).only("team", *RANKING_FIELDS)
+        games = Game.objects.filter(season=season)
+    return rows, games, points_strategy or DefaultPointsCalculation()
+
+
+def level_with(rows, points, points_strategy, scheme=DEFAULT_SCHEME):
+    """
+    Filter the ranked `rows` to the ones on `points`.
+    """
+    if scheme == DEFAULT_SCHEME:
+        return rows.filter(points=points)
+    return rows.alias(level_points=points_strategy.points_expression()).filter(level_points=points)
+
+
+def compute_ranking(top=None, scheme=DEFAULT_SCHEME, season=None):
+    ranked_rows, games, points_strategy = ranking_rows(scheme, season)
+    rows = list(ranked_rows if top is None else ranked_rows[:top])
+    if top is not None and len(rows) == top:
+        # The tiebreakers may lift a team level with the last row above it.
+        last_row = rows[-1]
+        level = level_with(ranked_rows, getattr(last_row, "scheme_points", last_row.points), points_strategy, scheme)
+        for row in level.exclude(pk__in=[row.pk for row in rows]):
+            row.rank = last_row.rank
+            rows.append(row)
+    ranking = [ranking_row(row, getattr(row, "scheme_points", None)) for row in rows]
+    team_ids = [getattr(row, "team_id", row.pk) for row in rows]
+    totals = {team_id: team_record(row) for team_id, row in zip(team_ids, rows)}
+    return break_ties(ranking, team_ids, games, points_strategy, totals)[:top]
+
+
+def get_ranking(top=None, scheme=DEFAULT_SCHEME, season=None):
+    """
+    Return the ranking table under a scoring `scheme`, over all seasons or within one
+    `season`, or its first `top` rows, served from the cache until the standings change.
+
+    The default scheme is read from the stored points, other schemes are computed from
+    the stored wins, draws and loses, so switching schemes never writes to the teams.
+    A season's table is read from its own standings rows. Teams level on points are
+    ordered by the STANDINGS_TIEBREAKERS rules and cached in that order.
+    """
+    name = "ranking" if scheme == DEFAULT_SCHEME else f"ranking:scheme:{scheme}"
+    if season is not None:
+        name = f"{name}:season:{season}"
+    if top is not None:
+        name = f"{name}:top:{top}"
+    return get_or_compute(name, lambda: compute_ranking(top, scheme, season))
+
+
+def get_team_ranking_row(name, scheme=DEFAULT_SCHEME, season=None):
+    """
+    Return the ranking row of a single team without ranking the whole table, only the
+    teams level with it on points are put through the tiebreakers.
+    """
+    rows, games, points_strategy = ranking_rows(scheme, season)
+    if season is None:
+        row = Team.objects.filter(name=name).only("name", *RANKING_FIELDS).first()
+    else:
+        row = TeamSeasonStanding.objects.filter(season=season, team__name=name).annotate(name=F("team__name")).first()
+    if row is None:
+        return None
+    if scheme == DEFAULT_SCHEME:
+        points, rank = row.points, rows.rank_of(row)
+    else:
+        points, rank = points_strategy.calculate_points(row), rows.rank_of(row, points_strategy)
+
+    level = list(level_with(rows, points, points_strategy, scheme))
+    ranking = [dict(ranking_row(level_row, points), rank=rank) for level_row in level]
+    team_ids = [getattr(level_row, "team_id", level_row.pk) for level_row in level]
+    totals = {team_id: team_record(level_row) for team_id, level_row in zip(team_ids, level)}
+    return next(
+        resolved
+        for resolved in break_ties(ranking, team_ids, games, points_strategy, totals)
+        if resolved["name"] == name
+    )
@@ -1,4 +1,118 @@
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from django.db.models import Count, F, Q, QuerySet, Sum
+
+from sports_league_app.cache import bump_standings_version
+
+GAME_RESULT_FIELDS = ["first_team", "first_team_score", "second_team", "second_team_score"]
+
+
+# Standings counters of Team and TeamSeasonStanding.
+STANDINGS_FIELDS = ["wins", "draws", "loses", "goals_for", "goals_against", "goal_difference", "points"]
+
+
+@dataclass
+class StandingsDelta:
+    """
+    Change to apply to a team's wins, draws, loses and goals counters.
+    """
+
+    wins: int = 0
+    draws: int = 0
+    loses: int = 0
+    goals_for: int = 0
+    goals_against: int = 0
+
+    def __add__(self, other):
+        return StandingsDelta(
+            self.wins + other.wins,
+            self.draws + other.draws,
+            self.loses + other.loses,
+            self.goals_for + other.goals_for,
+            self.goals_against + other.goals_against,
+        )
+
+    def __neg__(self):
+        return StandingsDelta(-self.wins, -self.draws, -self.loses, -self.goals_for, -self.goals_against)
+
+    def __bool__(self):
+        return bool(self.wins or self.draws or self.loses or self.goals_for or self.goals_against)
+
+    def apply_to(self, team):
+        team.wins += self.wins
+        team.draws += self.draws
+        team.loses += self.loses
+        team.goals_for += self.goals_for
+        team.goals_against += self.goals_against
+        team.goal_difference += self.goals_for - self.goals_against
+
+
+def new_deltas():
+    return defaultdict(StandingsDelta)
+
+
+def merge_deltas(deltas, other):
+    """
+    Add the {team_id: StandingsDelta} mapping `other` into `deltas`.
+    """
+    for team_id, delta in other.items():
+        deltas[team_id] += delta
+    return deltas
+
+
+def game_deltas(first_team_score, second_team_score, sign=1):
+    """
+    Return the (first team, second team) deltas produced by a single result.
+    """
+    first_team_goals = StandingsDelta(goals_for=sign * first_team_score, goals_against=sign * second_team_score)
+    second_team_goals = StandingsDelta(goals_for=sign * second_team_score, goals_against=sign * first_team_score)
+    if first_team_score == second_team_score:
+        return first_team_goals + StandingsDelta(draws=sign), second_team_goals + StandingsDelta(draws=sign)
+    if first_team_score > second_team_score:
+        return first_team_goals + StandingsDelta(wins=sign), second_team_goals + StandingsDelta(loses=sign)
+    return first_team_goals + StandingsDelta(loses=sign), second_team_goals + StandingsDelta(wins=sign)
+
+
+def aggregate_game_results(games, sign=1, by=None):
+    """
+    Count wins, draws and loses and sum the goals per team over the `games` queryset with
+    a single query.
+
+    Each side of the fixture is grouped on its own with conditional aggregates and the
+    two halves are combined with UNION ALL. Returns a {team_id: StandingsDelta} mapping,
+    negated when `sign` is -1. With `by`, a game field such as "round", the results are
+    also grouped on it and returned as {value: {team_id: StandingsDelta}}.
+    """
+    games = games.order_by()
+    group_by = [by] if by else []
+    first_team_results = games.values(*group_by, team=F("first_team")).annotate(
+        wins=Count("pk", filter=Q(first_team_score__gt=F("second_team_score"))),
+        draws=Count("pk", filter=Q(first_team_score=F("second_team_score"))),
+        loses=Count("pk", filter=Q(first_team_score__lt=F("second_team_score"))),
+        goals_for=Sum("first_team_score"),
+        goals_against=Sum("second_team_score"),
+    )
+    second_team_results = games.values(*group_by, team=F("second_team")).annotate(
+        wins=Count("pk", filter=Q(second_team_score__gt=F("first_team_score"))),
+        draws=Count("pk", filter=Q(second_team_score=F("first_team_score"))),
+        loses=Count("pk", filter=Q(second_team_score__lt=F("first_team_score"))),
+        goals_for=Sum("second_team_score"),
+        goals_against=Sum("first_team_score"),
+    )
+
+    results = defaultdict(new_deltas)
+    for row in first_team_results.union(second_team_results, all=True):
+        results[row[by] if by else None][row["team"]] += StandingsDelta(
+            sign * row["wins"],
+            sign * row["draws"],
+            sign * row["loses"],
+            sign * row["goals_for"],
+            sign * row["goals_against"],
+        )
+    return results if by else results[None]
 
 
 class PointsCalculationStrategy(ABC):
@@ -10,49 +124,126 @@ class PointsCalculationStrategy(ABC):
     def update_teams(self, game, delete=False):
         pass
 
+    def apply_games(self, games, sign=1):
+        """
+        Return the {team_id: StandingsDelta} change of adding (`sign=1`) or removing
+        (`sign=-1`) a whole batch of games, a queryset or an iterable of games.
+
+        Nothing is written; the bulk paths apply the result with `apply_team_deltas`.
+        This fallback works one game at a time without touching the teams.
+        """
+        if isinstance(games, QuerySet):
+            games = games.only(*GAME_RESULT_FIELDS).iterator()
+        deltas = new_deltas()
+        for game in games:
+            first_team_delta, second_team_delta = game_deltas(game.first_team_score, game.second_team_score, sign)
+            deltas[game.first_team_id] += first_team_delta
+            deltas[game.second_team_id] += second_team_delta
+        return deltas
+
+    def points_expression(self):
+        """
+        Return the database expression of a team's points under this strategy, computed
+        from its stored wins, draws and loses.
+        """
+        return self.calculate_points(SimpleNamespace(wins=F("wins"), draws=F("draws"), loses=F("loses")))
+
+    def update_score(self, game, old_first_team_score, old_second_team_score):
+        """
+        Move the teams' standings from the old score of `game` to its current one.
+        """
+        first_team_score, second_team_score = game.first_team_score, game.second_team_score
+        game.first_team_score, game.second_team_score = old_first_team_score, old_second_team_score
+        self.update_teams(game, delete=True)
+        game.first_team_score, game.second_team_score = first_team_score, second_team_score
+        self.update_teams(game)
+
 
 class DefaultPointsCalculation(PointsCalculationStrategy):
     def calculate_points(self, team):
         return team.wins * 3 + team.draws * 1 + team.loses * 0
 
-    def update_teams(self, game, delete=False):
-        first_team = game.first_team
-        second_team = game.second_team
-        if delete:
-            if game.is_draw():
-                first_team.draws -= 1
-                second_team.draws -= 1
-            elif game.is_winner(first_team):
-                first_team.wins -= 1
-                second_team.loses -= 1
-            else:
-                first_team.loses -= 1
-                second_team.wins -= 1
-        else:
-            if game.is_draw():
-                first_team.draws += 1
-                second_team.draws += 1
-            elif game.is_winner(first_team):
-                first_team.wins += 1
-                second_team.loses += 1
-            else:
-                first_team.loses += 1
-                second_team.wins += 1
-
-        first_team.save()
-        second_team.save()
-
-
-class AlternativePointsCalculation(PointsCalculationStrategy):
-    def calculate_points(self, team):
+    def apply_games(self, games, sign=1):
         """
-        Implement an alternative points calculation method here
-        Example: return team.wins * 2 + team.draws * 1 + team.loses * 0
+        Querysets are counted by the database with one aggregate query.
         """
-        pass
+        if isinstance(games, QuerySet):
+            return aggregate_game_results(games, sign)
+        return super().apply_games(games, sign)
 
     def update_teams(self, game, delete=False):
+        first_team_delta, second_team_delta = game_deltas(
+            game.first_team_score, game.second_team_score, sign=-1 if delete else 1
+        )
+        self.apply_delta(game.first_team, first_team_delta)
+        self.apply_delta(game.second_team, second_team_delta)
+
+    def update_score(self, game, old_first_team_score, old_second_team_score):
         """
-        Implement a way to calculate team wins, draws and loses and update teams depending on it
+        Apply only the net change between the old and the new score, with at most one
+        UPDATE per team and none when the score is unchanged.
         """
-        pass
+        old_deltas = game_deltas(old_first_team_score, old_second_team_score, sign=-1)
+        new_deltas = game_deltas(game.first_team_score, game.second_team_score)
+        for team, old_delta, new_delta in zip((game.first_team, game.second_team), old_deltas, new_deltas):
+            delta = old_delta + new_delta
+            if delta:
+                self.apply_delta(team, delta)
+
+    def apply_delta(self, team, delta):
+        """
+        Add a StandingsDelta to a team's counters with a single
+        `UPDATE ... SET wins = wins + 1, ...`.
+
+        The new points are computed by the database from the updated counters, so
+        concurrent updates of the same team never overwrite each other. The in-memory
+        team is updated to match.
+        """
+        updated = SimpleNamespace(
+            wins=F("wins") + delta.wins, draws=F("draws") + delta.draws, loses=F("loses") + delta.loses
+        )
+        type(team).objects.filter(pk=team.pk).update(
+            wins=updated.wins,
+            draws=updated.draws,
+            loses=updated.loses,
+            goals_for=F("goals_for") + delta.goals_for,
+            goals_against=F("goals_against") + delta.goals_against,
+            goal_difference=F("goal_difference") + delta.goals_for - delta.goals_against,
+            points=self.calculate_points(updated),
+        )
+        delta.apply_to(team)
+        team.points = self.calculate_points(team)
+        bump_standings_version()
+
+
+class AlternativePointsCalculation(DefaultPointsCalculation):
+    """
+    Two points for a win, one for a draw.
+    """
+
+    def calculate_points(self, team):
+        return team.wins * 2 + team.draws * 1 + team.loses * 0
+
+
+class BonusPointsCalculation(DefaultPointsCalculation):
+    """
+    Three points for a win and one for a draw, plus a bonus point for every game played.
+    """
+
+    def calculate_points(self, team):
+        return team.wins * 4 + team.draws * 2 + team.loses * 1
+
+
+DEFAULT_SCHEME = "3-1-0"
+
+# Scoring schemes the ranking can be served in. Only the default one is stored in
+# Team.points, the others are computed from the stored wins, draws and loses.
+POINTS_STRATEGIES = {
+    DEFAULT_SCHEME: DefaultPointsCalculation,
+    "2-1-0": AlternativePointsCalculation,
+    "bonus": BonusPointsCalculation,
+}
+
+
+def get_points_strategy(scheme=DEFAULT_SCHEME):
+    return POINTS_STRATEGIES[scheme]()
@@ -1,14 +1,57 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import tracemalloc
+from datetime import timedelta
 from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F, Q
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from sports_league_app.strategy import DefaultPointsCalculation
+from sports_league_app.cache import cache_stats
+from sports_league_app.history import SNAPSHOT_FIELDS, get_table_after_round, get_team_history, rebuild_history
+from sports_league_app.importers import CSVStreamReader, GameImporter, InvalidCSVFormat
+from sports_league_app.jobs import claim_next_job, rebuild_stale_ratings, run_import_job, run_pending_jobs
+from sports_league_app.standings import (
+    bulk_delete_games,
+    compute_ranking,
+    get_ranking,
+    get_team_ranking_row,
+    recompute_season_standings,
+    recompute_standings,
+    rollback_upload_batch,
+)
+from sports_league_app.strategy import (
+    AlternativePointsCalculation,
+    DefaultPointsCalculation,
+    PointsCalculationStrategy,
+)
 
 # Create your tests here.
-from .models import Game, Team
+from .models import (
+    Game,
+    ImportJob,
+    League,
+    RatingsState,
+    Season,
+    StandingsSnapshot,
+    Team,
+    TeamQuerySet,
+    TeamSeasonStanding,
+    UploadBatch,
+)
 
 User = get_user_model()
 
@@ -75,11 +118,10 @@ class UpdateTeamsTestCase(TestCase):
             response = self.client.post(
                 reverse("sports_league_app:edit_game", kwargs={"pk": self.game.pk}), data=form_data
             )
-            mock_strategy_instance.update_teams.assert_called_with(self.game)
+            mock_strategy_instance.update_score.assert_called_once_with(self.game, 2, 1)
             self.game.refresh_from_db()
             self.assertEqual(self.game.first_team_score, 3)
             self.assertEqual(self.game.second_team_score, 1)
-            mock_strategy_instance.update_teams.assert_called_with(self.game)
             self.assertEqual(response.status_code, 302)
             self.assertRedirects(response, reverse("sports_league_app:games_list"))
 
@@ -115,6 +157,44 @@ class UpdateTeamsTestCase(TestCase):
         self.second_team.delete()
 
 
+class ConcurrentUpdateTeamsTestCase(TransactionTestCase):
+    def test_concurrent_updates_are_not_lost(self):
+        first_team = Team.objects.create(name="Team 1")
+        second_team = Team.objects.create(name="Team 2")
+        game_ids = [
+            Game.objects.create(
+                first_team=first_team, first_team_score=1, second_team=second_team, second_team_score=0
+            ).pk
+            for _ in range(8)
+        ]
+        Team.objects.update(wins=0, draws=0, loses=0, points=0)
+        # Every thread holds its own stale copy of both teams, as separate workers would.
+        games = [Game.objects.select_related("first_team", "second_team").get(pk=pk) for pk in game_ids]
+        barrier = threading.Barrier(len(games))
+        errors = []
+
+        def update(game):
+            try:
+                barrier.wait()
+                DefaultPointsCalculation().update_teams(game)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=update, args=(game,)) for game in games]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        first_team.refresh_from_db()
+        second_team.refresh_from_db()
+        self.assertEqual((first_team.wins, first_team.points), (8, 24))
+        self.assertEqual((second_team.loses, second_team.points), (8, 0))
+
+
 class UploadCSVViewTestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="test_user", password="test_password")
@@ -127,11 +207,1275 @@ class UploadCSVViewTestCase(TestCase):
         response = self.client.post(reverse("sports_league_app:upload_csv"), {"csv_file": csv_file})
         self.assertIn("ranking", response.context)
         self.assertEqual(
-            [{"rank": 1, "name": "First Team", "points": 1}, {"rank": 2, "name": "Second Team", "points": 1}],
+            [{"rank": 1, "name": "First Team", "points": 1}, {"rank": 1, "name": "Second Team", "points": 1}],
             response.context["ranking"],
         )
 
 
+class GameImporterTestCase(TestCase):
+    rows = [
+        ["Lions", "3", "Snakes", "3"],
+        ["Tarantulas", "1", "FC Awesome", "0"],
+        ["Lions", "1", "FC Awesome", "1"],
+        ["Tarantulas", "3", "Snakes", "1"],
+        ["Lions", "4", "Grouches", "0"],
+        ["Grouches", "10", "Snakes", "9"],
+    ]
+
+    def standings(self):
+        return list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points"))
+
+    def test_matches_per_row_path(self):
+        for first_team_name, first_team_score, second_team_name, second_team_score in self.rows:
+            Game.objects.create(
+                first_team=Team.objects.get_or_create(name=first_team_name)[0],
+                first_team_score=int(first_team_score),
+                second_team=Team.objects.get_or_create(name=second_team_name)[0],
+                second_team_score=int(second_team_score),
+            )
+        expected = self.standings()
+        Game.objects.all().delete()
+        Team.objects.all().delete()
+
+        imported = GameImporter(batch_size=4).import_rows(self.rows)
+        self.assertEqual(imported, len(self.rows))
+        self.assertEqual(Game.objects.count(), len(self.rows))
+        self.assertEqual(self.standings(), expected)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            GameImporter().import_rows(self.rows)
+        Game.objects.all().delete()
+        Team.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            GameImporter().import_rows(self.rows * 20)
+        self.assertEqual(len(small), len(large))
+
+    def test_fixture_rows_are_upserted(self):
+        GameImporter().import_rows(
+            [
+                ["Lions", "3", "Snakes", "1", "F1"],
+                ["Lions", "0", "Grouches", "0", "F2"],
+                ["Snakes", "2", "Grouches", "0"],
+            ]
+        )
+        resent = [
+            ["Lions", "3", "Snakes", "1", "F1"],
+            ["Lions", "0", "Grouches", "2", "F2"],
+            ["Snakes", "1", "Lions", "1", "F3"],
+        ]
+
+        importer = GameImporter()
+        importer.import_rows(resent)
+        self.assertEqual(importer.games_updated, 1)
+        self.assertEqual(Game.objects.count(), 4)
+        self.assertEqual(Game.objects.get(fixture_id="F2").second_team_score, 2)
+        self.assertEqual(self.standings(), [("Grouches", 1, 0, 1, 3), ("Lions", 1, 1, 1, 4), ("Snakes", 1, 1, 1, 4)])
+        expected = self.standings()
+
+        with CaptureQueriesContext(connection) as queries:
+            GameImporter().import_rows(resent)
+        self.assertEqual(Game.objects.count(), 4)
+        self.assertEqual(self.standings(), expected)
+        self.assertFalse([query for query in queries if query["sql"].startswith(("INSERT", "UPDATE"))])
+
+        recompute_standings()
+        self.assertEqual(self.standings(), expected)
+
+    def test_invalid_row_imports_nothing(self):
+        with self.assertRaises(InvalidCSVFormat):
+            GameImporter().import_rows(self.rows + [["Lions", "1", "Snakes"]])
+        self.assertFalse(Game.objects.exists())
+        self.assertFalse(Team.objects.exists())
+
+
+class CSVStreamReaderTestCase(TestCase):
+    def test_rows_split_across_chunks(self):
+        chunks = [
+            b"Team_1 name,Team_1 score,Team_2 name,Team_2 score\nS\xc3",
+            b"\xa3o Paulo,1,Lions,2\nLi",
+            b"ons,0,Snakes,0",
+        ]
+        reader = CSVStreamReader(chunks)
+        self.assertEqual(list(reader), [["S\u00e3o Paulo", "1", "Lions", "2"], ["Lions", "0", "Snakes", "0"]])
+        self.assertEqual(reader.byte_offset, sum(len(chunk) for chunk in chunks))
+
+    def test_import_uses_constant_memory(self):
+        memory_budget = 2**20
+        rows = 5000
+        padding = b"x" * 280
+
+        def chunks():
+            yield b"Team_1 name,Team_1 score,Team_2 name,Team_2 score\n"
+            block = b"".join(
+                b"Team %d %s,%d,Team %d %s,%d\n" % (i % 20, padding, i % 5, (i + 7) % 20, padding, i % 3)
+                for i in range(50)
+            )
+            for _ in range(rows // 50):
+                yield block
+
+        file_size = sum(len(chunk) for chunk in chunks())
+        self.assertGreater(file_size, 2 * memory_budget)
+
+        tracemalloc.start()
+        try:
+            imported = GameImporter(batch_size=100).import_rows(CSVStreamReader(chunks()))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(imported, rows)
+        self.assertLess(peak, memory_budget)
+        decided_games = Game.objects.exclude(first_team_score=F("second_team_score")).count()
+        self.assertEqual(sum(Team.objects.values_list("wins", flat=True)), decided_games)
+
+
+class ImportJobTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+
+    def test_background_upload(self):
+        csv_content = "Team_1 name,Team_1 score,Team_2 name,Team_2 score\n" "Lions,3,Snakes,1\n" "Lions,1,Snakes,1\n"
+        csv_file = SimpleUploadedFile("test_file.csv", bytes(csv_content, encoding="utf-8"), content_type="text/csv")
+        response = self.client.post(reverse("sports_league_app:upload_csv"), {"csv_file": csv_file, "background": "1"})
+        job = response.context["import_job"]
+        self.assertEqual(job.status, ImportJob.Status.QUEUED)
+        self.assertFalse(Game.objects.exists())
+
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.rows_processed, 2)
+        self.assertEqual(job.byte_offset, len(csv_content))
+        self.assertEqual(Team.objects.get(name="Lions").points, 4)
+
+        response = self.client.get(reverse("sports_league_app:import_job_progress", args=[job.pk]))
+        self.assertEqual(response.json()["status"], "done")
+        self.assertEqual(response.json()["rows_processed"], 2)
+
+    def test_failed_job_records_error(self):
+        csv_file = SimpleUploadedFile("test_file.csv", b"header\nLions,3,Snakes\n", content_type="text/csv")
+        self.client.post(reverse("sports_league_app:upload_csv"), {"csv_file": csv_file, "background": "1"})
+        run_pending_jobs()
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+        self.assertEqual(job.error, "Invalid CSV Format")
+        self.assertEqual(run_pending_jobs(), 0)
+
+    def test_reupload_after_failed_job(self):
+        csv_content = b"header\nLions,3,Snakes,1\nLions,3,Snakes\n"
+        upload = {"csv_file": SimpleUploadedFile("test_file.csv", csv_content), "background": "1"}
+        self.client.post(reverse("sports_league_app:upload_csv"), upload)
+        run_import_job(claim_next_job(), batch_size=1)
+        failed_job = ImportJob.objects.get()
+        self.assertEqual(failed_job.status, ImportJob.Status.FAILED)
+        self.assertEqual(Game.objects.count(), 1)
+        self.assertIsNone(failed_job.upload_batch.finished_at)
+
+        upload = {"csv_file": SimpleUploadedFile("test_file.csv", csv_content), "background": "1"}
+        response = self.client.post(reverse("sports_league_app:upload_csv"), upload)
+        self.assertNotContains(response, "already imported")
+        self.assertEqual(response.context["import_job"].status, ImportJob.Status.QUEUED)
+        # The rows committed by the failed job were rolled back.
+        self.assertFalse(Game.objects.exists())
+        self.assertEqual(Team.objects.get(name="Lions").points, 0)
+        self.assertEqual(UploadBatch.objects.count(), 1)
+
+    def test_abandoned_job_is_resumed(self):
+        csv_content = b"header\nLions,3,Snakes,1\nLions,1,Snakes,1\nLions,0,Grouches,2\n"
+        self.client.post(
+            reverse("sports_league_app:upload_csv"),
+            {"csv_file": SimpleUploadedFile("test_file.csv", csv_content), "background": "1"},
+        )
+
+        def die_after_first_batch(job):
+            if job.rows_processed == 2:
+                raise SystemExit
+
+        with self.assertRaises(SystemExit):
+            run_import_job(claim_next_job(), batch_size=1, on_batch=die_after_first_batch)
+        job = ImportJob.objects.get()
+        self.assertEqual((job.status, job.rows_processed), (ImportJob.Status.RUNNING, 1))
+        # Still beating as far as other workers can tell.
+        self.assertIsNone(claim_next_job())
+
+        ImportJob.objects.update(heartbeat_at=F("heartbeat_at") - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER))
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.rows_processed, job.byte_offset), (ImportJob.Status.DONE, 3, len(csv_content))
+        )
+        self.assertEqual(Game.objects.count(), 3)
+        self.assertEqual(Team.objects.get(name="Lions").points, 4)
+
+    def test_missing_source_fails_the_job(self):
+        missing = ImportJob.objects.create(source_path=os.path.join(self.media_root, "missing.csv"))
+        self.client.post(
+            reverse("sports_league_app:upload_csv"),
+            {"csv_file": SimpleUploadedFile("test_file.csv", b"header\nLions,3,Snakes,1\n"), "background": "1"},
+        )
+        self.assertEqual(run_pending_jobs(), 2)
+        missing.refresh_from_db()
+        self.assertEqual(missing.status, ImportJob.Status.FAILED)
+        self.assertIn("missing.csv", missing.error)
+        self.assertEqual(ImportJob.objects.exclude(pk=missing.pk).get().status, ImportJob.Status.DONE)
+
+    def test_queue_drains_after_a_job_raises(self):
+        for name in ["first.csv", "second.csv"]:
+            self.client.post(
+                reverse("sports_league_app:upload_csv"),
+                {"csv_file": SimpleUploadedFile(name, f"header\n{name},3,Snakes,1\n".encode()), "background": "1"},
+            )
+        calls = []
+
+        def crash_first_job(job):
+            calls.append(job)
+            if len(calls) == 1:
+                raise OSError("disk gone")
+            return run_import_job(job)
+
+        with patch("sports_league_app.jobs.run_import_job", side_effect=crash_first_job):
+            self.assertEqual(run_pending_jobs(), 2)
+        self.assertEqual(
+            list(ImportJob.objects.order_by("pk").values_list("status", flat=True)),
+            [ImportJob.Status.RUNNING, ImportJob.Status.DONE],
+        )
+
+    def test_taken_over_job_stops(self):
+        csv_content = b"header\nLions,3,Snakes,1\nLions,1,Snakes,1\n"
+        self.client.post(
+            reverse("sports_league_app:upload_csv"),
+            {"csv_file": SimpleUploadedFile("test_file.csv", csv_content), "background": "1"},
+        )
+        job = claim_next_job()
+        ImportJob.objects.update(heartbeat_at=F("heartbeat_at") - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER))
+        self.assertEqual(claim_next_job().pk, job.pk)
+
+        # The first worker was only slow, its batch is rolled back instead of imported twice.
+        run_import_job(job)
+        self.assertFalse(Game.objects.exists())
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.Status.RUNNING)
+
+
+class ImportGamesCommandTestCase(TestCase):
+    csv_content = (
+        "Team_1 name,Team_1 score,Team_2 name,Team_2 score\n"
+        "Lions,3,Snakes,3\n"
+        "Tarantulas,1,FC Awesome,0\n"
+        "Lions,1,FC Awesome,1\n"
+        "Tarantulas,3,Snakes,1\n"
+        "Lions,4,Grouches,0\n"
+    )
+
+    def setUp(self):
+        csv_file = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        self.addCleanup(os.remove, csv_file.name)
+        with csv_file:
+            csv_file.write(self.csv_content)
+        self.path = csv_file.name
+
+    def test_import_games(self):
+        out = io.StringIO()
+        call_command("import_games", self.path, "--batch-size", "2", stdout=out)
+        self.assertIn("rows/sec", out.getvalue())
+        self.assertEqual(Game.objects.count(), 5)
+        self.assertEqual(Team.objects.get(name="Lions").points, 5)
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.byte_offset, len(self.csv_content))
+
+    def test_resume_after_crash(self):
+        self.crash_after_first_batch()
+        job = ImportJob.objects.get()
+        self.assertEqual(job.rows_processed, 2)
+
+        out = io.StringIO()
+        call_command("import_games", self.path, "--batch-size", "2", stdout=out)
+        self.assertIn("Resuming from row 2", out.getvalue())
+        self.assertEqual(Game.objects.count(), 5)
+
+        out = io.StringIO()
+        call_command("import_games", self.path, stdout=out)
+        self.assertIn("already imported", out.getvalue())
+        self.assertEqual(Game.objects.count(), 5)
+        self.assertEqual(Team.objects.get(name="Lions").points, 5)
+        self.assertEqual(Team.objects.get(name="Snakes").loses, 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.rows_processed, 5)
+
+    def crash_after_first_batch(self):
+        import_batch = GameImporter.import_batch
+        calls = []
+
+        def crash_on_second_batch(importer, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError("worker killed")
+            return import_batch(importer, rows)
+
+        with patch.object(GameImporter, "import_batch", autospec=True, side_effect=crash_on_second_batch):
+            with self.assertRaises(CommandError):
+                call_command("import_games", self.path, "--batch-size", "2", stdout=io.StringIO())
+        self.assertEqual(Game.objects.count(), 2)
+
+    def test_queue_workers_leave_command_jobs_alone(self):
+        import_batch = GameImporter.import_batch
+        claimed = []
+
+        def claim_during_import(importer, rows):
+            claimed.append(claim_next_job())
+            return import_batch(importer, rows)
+
+        with patch.object(GameImporter, "import_batch", autospec=True, side_effect=claim_during_import):
+            call_command("import_games", self.path, "--batch-size", "2", stdout=io.StringIO())
+        self.assertEqual(claimed, [None, None, None])
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.Status.DONE)
+
+    def test_taken_over_import_fails(self):
+        import_batch = GameImporter.import_batch
+
+        def take_over_on_second_batch(importer, rows):
+            if Game.objects.count() == 2:
+                ImportJob.objects.update(heartbeat_at=timezone.now() + timedelta(seconds=1))
+            return import_batch(importer, rows)
+
+        with patch.object(GameImporter, "import_batch", autospec=True, side_effect=take_over_on_second_batch):
+            with self.assertRaisesMessage(CommandError, "taken over by another worker after 2 rows"):
+                call_command("import_games", self.path, "--batch-size", "2", stdout=io.StringIO())
+        self.assertEqual(Game.objects.count(), 2)
+
+    def test_changed_file_rolls_back_superseded_run(self):
+        self.crash_after_first_batch()
+        with open(self.path, "a") as csv_file:
+            csv_file.write("Lions,2,Grouches,0\n")
+
+        out = io.StringIO()
+        call_command("import_games", self.path, "--batch-size", "2", stdout=out)
+        self.assertIn("starting over", out.getvalue())
+        self.assertEqual(Game.objects.count(), 6)
+        self.assertEqual(Team.objects.get(name="Lions").wins, 2)
+        self.assertEqual(ImportJob.objects.filter(status=ImportJob.Status.FAILED).count(), 1)
+
+    def test_same_size_edit_is_not_resumed(self):
+        self.crash_after_first_batch()
+        with open(self.path, "w") as csv_file:
+            csv_file.write(self.csv_content.replace("Lions,4,Grouches,0", "Lions,0,Grouches,4"))
+
+        out = io.StringIO()
+        call_command("import_games", self.path, "--batch-size", "2", stdout=out)
+        self.assertIn("starting over", out.getvalue())
+        self.assertEqual(Game.objects.count(), 5)
+        self.assertEqual(Team.objects.get(name="Grouches").wins, 1)
+        self.assertEqual(Team.objects.get(name="Lions").points, 2)
+
+
+class PerGamePointsCalculation(PointsCalculationStrategy):
+    """
+    Strategy relying on the per-game `apply_games` fallback of the base class.
+    """
+
+    def calculate_points(self, team):
+        return team.wins * 3 + team.draws * 1 + team.loses * 0
+
+    def update_teams(self, game, delete=False):
+        DefaultPointsCalculation().update_teams(game, delete)
+
+
+class ApplyGamesTestCase(TestCase):
+    def setUp(self):
+        GameImporter().import_rows(GameImporterTestCase.rows)
+
+    def test_default_matches_per_game_fallback(self):
+        games = Game.objects.all()
+        self.assertEqual(DefaultPointsCalculation().apply_games(games), PerGamePointsCalculation().apply_games(games))
+        self.assertEqual(
+            DefaultPointsCalculation().apply_games(games, sign=-1),
+            PerGamePointsCalculation().apply_games(list(games), sign=-1),
+        )
+
+    def test_default_aggregates_queryset_in_one_query(self):
+        with self.assertNumQueries(1):
+            DefaultPointsCalculation().apply_games(Game.objects.all())
+
+    def test_bulk_paths_use_strategy(self):
+        strategy = AlternativePointsCalculation()
+        recompute_standings(points_strategy=strategy)
+        self.assertEqual(Team.objects.get(name="Lions").points, 2 * 1 + 2)
+
+        GameImporter(points_strategy=strategy).import_rows([["Lions", "2", "Snakes", "0"]])
+        self.assertEqual(Team.objects.get(name="Lions").points, 2 * 2 + 2)
+
+        bulk_delete_games(Game.objects.filter(first_team__name="Lions"), points_strategy=strategy)
+        self.assertEqual(Team.objects.get(name="Lions").points, 0)
+
+    def test_per_game_strategy_recompute(self):
+        Team.objects.update(wins=0, draws=0, loses=0, points=0)
+        recompute_standings(points_strategy=PerGamePointsCalculation())
+        self.assertEqual(Team.objects.get(name="Grouches").points, 3)
+
+
+class RecomputeStandingsTestCase(TestCase):
+    def setUp(self):
+        GameImporter().import_rows(GameImporterTestCase.rows)
+        self.expected = list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points"))
+        Team.objects.filter(name__in=["Lions", "Snakes"]).update(wins=7, draws=0, loses=3, points=21)
+
+    def test_recompute_standings(self):
+        with CaptureQueriesContext(connection) as queries:
+            changed = recompute_standings()
+        self.assertEqual(sorted(team.name for team in changed), ["Lions", "Snakes"])
+        self.assertEqual(
+            list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points")), self.expected
+        )
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("SELECT")]), 2)
+
+    def test_recompute_selected_teams(self):
+        call_command("recompute_standings", stdout=io.StringIO())
+        Team.objects.filter(name__in=["Lions", "Snakes"]).update(wins=7)
+        changed = recompute_standings(teams=Team.objects.filter(name="Lions"))
+        self.assertEqual([team.name for team in changed], ["Lions"])
+        self.assertEqual(Team.objects.get(name="Snakes").wins, 7)
+
+
+class BulkDeleteGamesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        GameImporter().import_rows(GameImporterTestCase.rows * 3)
+
+    def standings(self):
+        return list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points"))
+
+    def test_bulk_delete_matches_recompute(self):
+        lions = Team.objects.get(name="Lions")
+        games = Game.objects.filter(Q(first_team=lions) | Q(second_team=lions))
+        with CaptureQueriesContext(connection) as few_games:
+            self.assertEqual(bulk_delete_games(games.filter(pk__in=games.values("pk")[:3])), 3)
+        with CaptureQueriesContext(connection) as many_games:
+            self.assertEqual(bulk_delete_games(games), 6)
+        self.assertEqual(len(few_games), len(many_games))
+        self.assertFalse(games.exists())
+
+        standings = self.standings()
+        self.assertEqual(recompute_standings(), [])
+        self.assertEqual(self.standings(), standings)
+        self.assertEqual(Team.objects.get(name="Lions").points, 0)
+
+    def test_bulk_delete_view(self):
+        ids = list(Game.objects.filter(first_team__name="Tarantulas").values_list("pk", flat=True))
+        response = self.client.post(reverse("sports_league_app:bulk_delete_games"), {"ids": ids})
+        self.assertRedirects(response, reverse("sports_league_app:games_list"))
+        self.assertEqual(Game.objects.count(), 18 - len(ids))
+        self.assertEqual(Team.objects.get(name="Tarantulas").points, 0)
+
+        team = Team.objects.get(name="Snakes")
+        self.client.post(reverse("sports_league_app:bulk_delete_games"), {"team": team.pk})
+        self.assertFalse(Game.objects.filter(Q(first_team=team) | Q(second_team=team)).exists())
+        self.assertEqual(recompute_standings(), [])
+
+
+class UploadBatchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        GameImporter().import_rows(GameImporterTestCase.rows)
+        self.standings = list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points"))
+
+    def csv_content(self, rows):
+        header = "Team_1 name,Team_1 score,Team_2 name,Team_2 score\n"
+        return (header + "".join(",".join(row) + "\n" for row in rows)).encode()
+
+    def upload(self, rows):
+        csv_file = SimpleUploadedFile("season.csv", self.csv_content(rows), content_type="text/csv")
+        self.client.post(reverse("sports_league_app:upload_csv"), {"csv_file": csv_file})
+        return UploadBatch.objects.latest("pk")
+
+    def test_upload_is_recorded_and_rolled_back(self):
+        upload_batch = self.upload(GameImporterTestCase.rows * 5)
+        self.assertEqual(upload_batch.file_name, "season.csv")
+        self.assertEqual(upload_batch.row_count, 30)
+        self.assertEqual(len(upload_batch.content_hash), 64)
+        self.assertEqual(upload_batch.games.count(), 30)
+        self.assertIsNotNone(upload_batch.rows_per_second)
+
+        response = self.client.get(reverse("sports_league_app:upload_batches"))
+        self.assertContains(response, "season.csv")
+
+        response = self.client.post(reverse("sports_league_app:rollback_upload_batch", args=[upload_batch.pk]))
+        self.assertRedirects(response, reverse("sports_league_app:upload_batches"))
+        self.assertFalse(UploadBatch.objects.exists())
+        self.assertEqual(Game.objects.count(), len(GameImporterTestCase.rows))
+        self.assertEqual(
+            list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points")),
+            self.standings,
+        )
+
+    def test_repeated_upload_is_skipped(self):
+        upload_batch = self.upload(GameImporterTestCase.rows)
+        self.assertEqual(
+            upload_batch.content_hash, hashlib.sha256(self.csv_content(GameImporterTestCase.rows)).hexdigest()
+        )
+        self.client.get(reverse("sports_league_app:upload_csv"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("sports_league_app:upload_csv"),
+                {"csv_file": SimpleUploadedFile("copy.csv", self.csv_content(GameImporterTestCase.rows))},
+            )
+        self.assertContains(response, "already imported")
+        self.assertEqual(UploadBatch.objects.count(), 1)
+        self.assertEqual(Game.objects.count(), 2 * len(GameImporterTestCase.rows))
+        self.assertFalse([query for query in queries if "sports_league_app_team" in query["sql"]])
+
+    def test_upload_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username="test_user", password="test_password")
+        csv_file = SimpleUploadedFile("season.csv", self.csv_content(GameImporterTestCase.rows))
+        response = client.post(reverse("sports_league_app:upload_csv"), {"csv_file": csv_file})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(UploadBatch.objects.exists())
+
+    def test_rollback_query_count_is_constant(self):
+        small = self.upload(GameImporterTestCase.rows)
+        large = self.upload(GameImporterTestCase.rows * 20)
+        with CaptureQueriesContext(connection) as small_rollback:
+            rollback_upload_batch(small)
+        with CaptureQueriesContext(connection) as large_rollback:
+            rollback_upload_batch(large)
+        self.assertEqual(len(small_rollback), len(large_rollback))
+
+
+class RankingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        GameImporter().import_rows(GameImporterTestCase.rows)
+
+    def test_ties_share_rank(self):
+        self.assertEqual(
+            [(team.rank, team.name, team.points) for team in Team.objects.ranked()],
+            [(1, "Tarantulas", 6), (2, "Lions", 5), (3, "Grouches", 3), (4, "FC Awesome", 1), (4, "Snakes", 1)],
+        )
+
+    def test_top_with_team_row(self):
+        response = self.client.get(reverse("sports_league_app:upload_csv"), {"top": 2, "team": "Snakes"})
+        self.assertEqual([row["name"] for row in response.context["ranking"]], ["Tarantulas", "Lions"])
+        # Level with FC Awesome on points, behind it on goal difference.
+        self.assertEqual(response.context["team_row"], {"rank": 5, "name": "Snakes", "points": 1})
+
+    def test_schemes_computed_from_stored_results(self):
+        stored = list(Team.objects.values_list("name", "points"))
+        response = self.client.get(reverse("sports_league_app:upload_csv"), {"scheme": "2-1-0"})
+        self.assertEqual(
+            [(row["rank"], row["name"], row["points"]) for row in response.context["ranking"]],
+            [(1, "Lions", 4), (2, "Tarantulas", 4), (3, "Grouches", 2), (4, "FC Awesome", 1), (5, "Snakes", 1)],
+        )
+        response = self.client.get(
+            reverse("sports_league_app:upload_csv"), {"scheme": "bonus", "top": 3, "team": "FC Awesome"}
+        )
+        self.assertEqual(
+            [(row["rank"], row["name"], row["points"]) for row in response.context["ranking"]],
+            [(1, "Lions", 8), (2, "Tarantulas", 8), (3, "Grouches", 5)],
+        )
+        self.assertEqual(response.context["team_row"], {"rank": 5, "name": "FC Awesome", "points": 3})
+        self.assertEqual(list(Team.objects.values_list("name", "points")), stored)
+
+        with self.assertNumQueries(0):
+            get_ranking(scheme="2-1-0")
+
+    def test_unknown_scheme_falls_back_to_default(self):
+        response = self.client.get(reverse("sports_league_app:upload_csv"), {"scheme": "1-0-0"})
+        self.assertEqual(response.context["scheme"], "3-1-0")
+        self.assertEqual(response.context["ranking"][0], {"rank": 1, "name": "Tarantulas", "points": 6})
+
+
+class TiebreakerTestCase(TestCase):
+    def standings(self, ranking):
+        return [(row["rank"], row["name"]) for row in ranking]
+
+    def test_head_to_head_before_goal_difference(self):
+        # Lions, Snakes and Tarantulas end on 3 points. Snakes have the best goal difference
+        # but lost to Lions, who lost to Tarantulas.
+        GameImporter().import_rows(
+            [["Lions", "1", "Snakes", "0"], ["Snakes", "5", "Grouches", "0"], ["Tarantulas", "3", "Lions", "0"]]
+        )
+        self.assertEqual(
+            self.standings(get_ranking()), [(1, "Tarantulas"), (2, "Lions"), (3, "Snakes"), (4, "Grouches")]
+        )
+
+    def test_configurable_rules(self):
+        # Every team won once, the head-to-head points go round in a circle.
+        GameImporter().import_rows(
+            [["Lions", "1", "Snakes", "0"], ["Snakes", "5", "Grouches", "0"], ["Grouches", "1", "Lions", "0"]]
+        )
+        self.assertEqual(self.standings(compute_ranking()), [(1, "Snakes"), (2, "Lions"), (3, "Grouches")])
+        with override_settings(STANDINGS_TIEBREAKERS=["head_to_head_points"]):
+            self.assertEqual(self.standings(compute_ranking()), [(1, "Snakes"), (1, "Lions"), (1, "Grouches")])
+        with override_settings(STANDINGS_TIEBREAKERS=["goals_for"]):
+            self.assertEqual(self.standings(compute_ranking()), [(1, "Snakes"), (2, "Lions"), (2, "Grouches")])
+
+    def test_tie_group_read_with_one_query(self):
+        names = [f"Team {number:02}" for number in range(20)]
+        # Every team beats the next one by one goal, in a circle.
+        GameImporter().import_rows([[name, "1", names[(index + 1) % 20], "0"] for index, name in enumerate(names)])
+        with self.assertNumQueries(2):
+            ranking = compute_ranking()
+        self.assertEqual([row["rank"] for row in ranking], [1] * 20)
+
+    def test_top_resolves_tie_across_the_cut(self):
+        # Lions come first by name, Snakes are level on points and won the head-to-head.
+        GameImporter().import_rows([["Lions", "3", "Grouches", "0"], ["Snakes", "1", "Lions", "0"]])
+        self.assertEqual(get_ranking(top=1), [{"rank": 1, "name": "Snakes", "points": 3}])
+        self.assertEqual(get_team_ranking_row("Lions"), {"rank": 2, "name": "Lions", "points": 3})
+
+
+class StandingsViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        GameImporter().import_rows(GameImporterTestCase.rows)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse("sports_league_app:standings"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_conditional_get(self):
+        url = reverse("sports_league_app:standings")
+        response = self.client.get(url, {"top": 2})
+        self.assertEqual(
+            response.json()["ranking"],
+            [{"rank": 1, "name": "Tarantulas", "points": 6}, {"rank": 2, "name": "Lions", "points": 5}],
+        )
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        # Only the session and the user are read, not the standings.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"top": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertFalse([query for query in queries if "sports_league_app_" in query["sql"]])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get(url, {"scheme": "2-1-0", "top": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        GameImporter().import_rows([["Snakes", "5", "Lions", "0"]])
+        response = self.client.get(url, {"top": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@override_settings(INGEST_API_TOKENS=["feed-token"], INGEST_BATCH_SIZE=2)
+class IngestGamesViewTestCase(TestCase):
+    def post(self, data, content_type="application/json", token="feed-token"):
+        return self.client.post(
+            reverse("sports_league_app:ingest_games"),
+            data,
+            content_type=content_type,
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+    def test_requires_token(self):
+        self.assertEqual(self.post("[]", token="wrong").status_code, 401)
+        response = self.client.post(reverse("sports_league_app:ingest_games"), "[]", content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_json_array_with_per_row_results(self):
+        games = [
+            {"first_team": "Lions", "first_team_score": 3, "second_team": "Snakes", "second_team_score": 3},
+            {"first_team": "Tarantulas", "first_team_score": -1, "second_team": "Snakes", "second_team_score": 0},
+            {"first_team": "Lions", "second_team": "Snakes"},
+            {"first_team": "Lions", "first_team_score": 4, "second_team": "Grouches", "second_team_score": 0},
+            {"first_team": "Grouches", "first_team_score": 1, "second_team": "Snakes", "second_team_score": 0},
+        ]
+        response = self.post(json.dumps(games))
+        result = response.json()
+        self.assertEqual((result["imported"], result["errors"]), (3, 2))
+        self.assertEqual(
+            [row["status"] for row in result["results"]], ["imported", "error", "error", "imported", "imported"]
+        )
+        self.assertEqual(result["results"][1]["error"], "Invalid score in row: Tarantulas,-1,Snakes,0")
+        self.assertEqual(Game.objects.count(), 3)
+        self.assertEqual(Team.objects.get(name="Lions").points, 4)
+
+    def test_ndjson_upserts_fixtures(self):
+        game = {"first_team": "Lions", "first_team_score": 1, "second_team": "Snakes", "second_team_score": 0}
+        lines = [
+            json.dumps(dict(game, fixture_id=7)),
+            "not json",
+            "",
+            json.dumps(dict(game, first_team_score=0, second_team_score=2, fixture_id=7)),
+        ]
+        result = self.post("\n".join(lines), content_type="application/x-ndjson").json()
+        self.assertEqual([row["index"] for row in result["results"]], [0, 1, 2])
+        self.assertEqual(result["results"][1], {"index": 1, "status": "error", "error": "Invalid JSON"})
+        self.assertEqual(Game.objects.get().fixture_id, "7")
+        self.assertEqual(Team.objects.get(name="Snakes").points, 3)
+        self.assertEqual(Team.objects.get(name="Lions").points, 0)
+
+    def test_rejects_invalid_teams_and_scores(self):
+        game = {"first_team": "Lions", "first_team_score": 1, "second_team": "Snakes", "second_team_score": 0}
+        records = [
+            dict(game, first_team=7),
+            dict(game, second_team=None),
+            dict(game, first_team=""),
+            dict(game, second_team="   "),
+            dict(game, first_team="L" * 301),
+            dict(game, second_team="Lions"),
+            dict(game, first_team_score=True),
+            dict(game, second_team_score=1.5),
+            dict(game, first_team_score="2"),
+            dict(game, first_team="L" * 300),
+        ]
+        result = self.post(json.dumps(records)).json()
+        first_name_error = "first_team must be a team name of 1 to 300 characters"
+        second_name_error = "second_team must be a team name of 1 to 300 characters"
+        self.assertEqual((result["imported"], result["errors"]), (1, 9))
+        self.assertEqual(
+            [row.get("error") for row in result["results"]],
+            [
+                first_name_error,
+                second_name_error,
+                first_name_error,
+                second_name_error,
+                first_name_error,
+                "first_team and second_team must be different teams",
+                "first_team_score must be an integer",
+                "second_team_score must be an integer",
+                "first_team_score must be an integer",
+                None,
+            ],
+        )
+        self.assertEqual(Game.objects.count(), 1)
+        self.assertFalse(Team.objects.filter(name="").exists())
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        GameImporter().import_rows(GameImporterTestCase.rows + [["Lions", "2", "Snakes", "0", "F1"]])
+
+    def test_games_csv_round_trip(self):
+        response = self.client.get(reverse("sports_league_app:export", args=["games"]))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        content = b"".join(response.streaming_content)
+        self.assertTrue(content.endswith(b"Lions,2,Snakes,0,F1,\n"))
+        expected = list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points"))
+
+        Game.objects.all().delete()
+        Team.objects.all().delete()
+        GameImporter().import_rows(CSVStreamReader([content]))
+        self.assertEqual(
+            list(Team.objects.order_by("name").values_list("name", "wins", "draws", "loses", "points")), expected
+        )
+
+    def test_standings_ndjson(self):
+        response = self.client.get(reverse("sports_league_app:export", args=["standings"]), {"format": "ndjson"})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            rows[0],
+            {
+                "rank": 1,
+                "team": "Lions",
+                "wins": 2,
+                "draws": 2,
+                "loses": 0,
+                "goals_for": 10,
+                "goals_against": 4,
+                "goal_difference": 6,
+                "points": 8,
+            },
+        )
+        # Same order and ranks as the ranking table, tiebreakers included.
+        self.assertEqual(
+            [{"rank": row["rank"], "name": row["team"], "points": row["points"]} for row in rows], compute_ranking()
+        )
+
+    def test_season_standings_csv(self):
+        season = Season.objects.create(league=League.objects.create(name="Premier"), name="2026")
+        GameImporter(season=season).import_rows([["Tarantulas", "1", "Lions", "0"], ["Lions", "4", "Snakes", "0"]])
+        response = self.client.get(
+            reverse("sports_league_app:export", args=["standings"]), {"season": season.pk, "format": "csv"}
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            [
+                "Rank,Team,Wins,Draws,Loses,Goals for,Goals against,Goal difference,Points",
+                "1,Tarantulas,1,0,0,1,0,1,3",
+                "2,Lions,1,0,1,4,1,3,3",
+                "3,Snakes,0,0,1,0,4,-4,0",
+            ],
+        )
+
+    def test_unknown_dataset_or_format(self):
+        self.assertEqual(self.client.get(reverse("sports_league_app:export", args=["teams"])).status_code, 404)
+        response = self.client.get(reverse("sports_league_app:export", args=["games"]), {"format": "xml"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_command_streams_in_chunks(self):
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("export_league_data", "games", "--chunk-size", "2", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "Team_1 name,Team_1 score,Team_2 name,Team_2 score,Fixture id,Round")
+        self.assertEqual(len(lines), Game.objects.count() + 1)
+        # The team names come with the games, no query per row.
+        self.assertLessEqual(len(queries), 2)
+
+
+class SeasonTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        league = League.objects.create(name="Premier")
+        self.first_season = Season.objects.create(league=league, name="2025")
+        self.second_season = Season.objects.create(league=league, name="2026")
+        GameImporter(season=self.first_season).import_rows(GameImporterTestCase.rows)
+        GameImporter(season=self.second_season).import_rows(
+            [["Snakes", "2", "Lions", "0"], ["Snakes", "1", "Lions", "1"]]
+        )
+
+    def season_standings(self, season):
+        return list(
+            TeamSeasonStanding.objects.filter(season=season)
+            .order_by("team__name")
+            .values_list("team__name", "wins", "draws", "loses", "points")
+        )
+
+    def test_rankings_scoped_to_season(self):
+        self.assertEqual(
+            get_ranking(season=self.second_season.pk),
+            [{"rank": 1, "name": "Snakes", "points": 4}, {"rank": 2, "name": "Lions", "points": 1}],
+        )
+        self.assertEqual(get_ranking(season=self.first_season.pk)[0], {"rank": 1, "name": "Tarantulas", "points": 6})
+        self.assertEqual(Team.objects.get(name="Snakes").points, 1 + 4)
+
+        response = self.client.get(
+            reverse("sports_league_app:upload_csv"), {"season": self.second_season.pk, "scheme": "2-1-0", "top": 1}
+        )
+        self.assertEqual(response.context["ranking"], [{"rank": 1, "name": "Snakes", "points": 3}])
+        response = self.client.get(
+            reverse("sports_league_app:upload_csv"), {"season": self.second_season.pk, "top": 1, "team": "Lions"}
+        )
+        self.assertEqual(response.context["team_row"], {"rank": 2, "name": "Lions", "points": 1})
+
+    def test_single_game_paths_update_season(self):
+        lions, snakes = Team.objects.get(name="Lions"), Team.objects.get(name="Snakes")
+        game = Game.objects.create(
+            first_team=lions, first_team_score=3, second_team=snakes, second_team_score=0, season=self.second_season
+        )
+        self.assertEqual(self.season_standings(self.second_season), [("Lions", 1, 1, 1, 4), ("Snakes", 1, 1, 1, 4)])
+
+        self.client.post(
+            reverse("sports_league_app:edit_game", args=[game.pk]), {"first_team_score": 0, "second_team_score": 3}
+        )
+        self.assertEqual(self.season_standings(self.second_season), [("Lions", 0, 1, 2, 1), ("Snakes", 2, 1, 0, 7)])
+
+        Game.objects.get(pk=game.pk).delete()
+        self.assertEqual(self.season_standings(self.second_season), [("Lions", 0, 1, 1, 1), ("Snakes", 1, 1, 0, 4)])
+
+    def test_bulk_delete_and_recompute(self):
+        bulk_delete_games(Game.objects.filter(Q(first_team__name="Lions") | Q(second_team__name="Lions")))
+        self.assertEqual(self.season_standings(self.second_season), [("Lions", 0, 0, 0, 0), ("Snakes", 0, 0, 0, 0)])
+        self.assertEqual(Team.objects.get(name="Snakes").points, 0)
+        self.assertEqual(recompute_standings(), [])
+
+        expected = self.season_standings(self.first_season)
+        TeamSeasonStanding.objects.filter(season=self.first_season).update(wins=0, draws=0, loses=0, points=0)
+        TeamSeasonStanding.objects.filter(season=self.first_season, team__name="Grouches").delete()
+        out = io.StringIO()
+        call_command("recompute_standings", "--season", str(self.first_season.pk), stdout=out)
+        self.assertIn("4 row(s) corrected", out.getvalue())
+        self.assertEqual(self.season_standings(self.first_season), expected)
+
+    def test_upsert_moves_game_between_seasons(self):
+        GameImporter(season=self.first_season).import_rows([["Lions", "1", "Snakes", "0", "F9"]])
+        GameImporter(season=self.second_season).import_rows([["Lions", "1", "Snakes", "0", "F9"]])
+        self.assertEqual(Game.objects.get(fixture_id="F9").season, self.second_season)
+        self.assertEqual(self.season_standings(self.second_season), [("Lions", 1, 1, 1, 4), ("Snakes", 1, 1, 1, 4)])
+        self.assertEqual(
+            dict((row[0], row[1:]) for row in self.season_standings(self.first_season))["Lions"], (1, 2, 0, 5)
+        )
+        self.assertEqual(recompute_standings(), [])
+
+
+class GoalCountersTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        self.season = Season.objects.create(league=League.objects.create(name="Premier"), name="2026")
+
+    def goals(self, model=Team, **filters):
+        return list(
+            model.objects.filter(**filters).order_by("pk").values_list("goals_for", "goals_against", "goal_difference")
+        )
+
+    def assertInSync(self):
+        self.assertEqual(recompute_standings(), [])
+        self.assertEqual(recompute_season_standings(self.season), [])
+
+    def test_single_game_paths(self):
+        lions, snakes = Team.objects.create(name="Lions"), Team.objects.create(name="Snakes")
+        game = Game.objects.create(
+            first_team=lions, first_team_score=3, second_team=snakes, second_team_score=1, season=self.season
+        )
+        self.assertEqual(self.goals(), [(3, 1, 2), (1, 3, -2)])
+        self.assertEqual(self.goals(TeamSeasonStanding, season=self.season), [(3, 1, 2), (1, 3, -2)])
+
+        # The winner does not change, only the goals counters move.
+        self.client.post(
+            reverse("sports_league_app:edit_game", args=[game.pk]), {"first_team_score": 4, "second_team_score": 0}
+        )
+        self.assertEqual(self.goals(), [(4, 0, 4), (0, 4, -4)])
+        self.assertEqual(self.goals(TeamSeasonStanding, season=self.season), [(4, 0, 4), (0, 4, -4)])
+        self.assertInSync()
+
+        Game.objects.get(pk=game.pk).delete()
+        self.assertEqual(self.goals(), [(0, 0, 0), (0, 0, 0)])
+        self.assertEqual(self.goals(TeamSeasonStanding, season=self.season), [(0, 0, 0), (0, 0, 0)])
+
+    def test_import_upsert_and_bulk_delete(self):
+        GameImporter(season=self.season).import_rows(
+            [["Lions", "3", "Snakes", "1", "F1"], ["Snakes", "2", "Grouches", "2"], ["Grouches", "0", "Lions", "1"]]
+        )
+        GameImporter(season=self.season).import_rows([["Lions", "0", "Snakes", "1", "F1"]])
+        self.assertEqual(
+            dict(Team.objects.values_list("name", "goal_difference")), {"Lions": 0, "Snakes": 1, "Grouches": -1}
+        )
+        self.assertInSync()
+
+        bulk_delete_games(Game.objects.filter(first_team__name="Snakes"))
+        self.assertEqual(self.goals(name="Grouches"), [(0, 1, -1)])
+        self.assertInSync()
+
+    def test_ranking_orders_level_teams_by_goals(self):
+        GameImporter().import_rows(
+            [["Lions", "1", "Snakes", "0"], ["Snakes", "5", "Grouches", "0"], ["Grouches", "1", "Lions", "0"]]
+        )
+        self.assertEqual(
+            list(Team.objects.ranked().values_list("rank", "name")), [(1, "Snakes"), (1, "Lions"), (1, "Grouches")]
+        )
+        with override_settings(STANDINGS_TIEBREAKERS=["goal_difference"]):
+            self.assertEqual(
+                [(row["rank"], row["name"]) for row in compute_ranking()],
+                [(1, "Snakes"), (2, "Lions"), (3, "Grouches")],
+            )
+
+
+class StandingsHistoryTestCase(TestCase):
+    rows = [
+        ["Lions", "2", "Snakes", "0", "F1", "1"],
+        ["Grouches", "1", "Tarantulas", "1", "", "1"],
+        ["Snakes", "3", "Grouches", "0", "", "2"],
+        ["Lions", "0", "Tarantulas", "1", "F2", "2"],
+        ["Lions", "1", "Grouches", "1", "", "3"],
+    ]
+
+    def setUp(self):
+        self.season = Season.objects.create(league=League.objects.create(name="Premier"), name="2026")
+        GameImporter(season=self.season).import_rows(self.rows)
+
+    def table(self, round_number):
+        return self.table_of(Season.objects.get(pk=self.season.pk), round_number)
+
+    def table_of(self, season, round_number):
+        return [(row["position"], row["name"], row["points"]) for row in get_table_after_round(season, round_number)]
+
+    def test_table_after_round(self):
+        self.assertEqual(Season.objects.get(pk=self.season.pk).history_stale_from, 1)
+        self.assertEqual(self.table(1), [(1, "Lions", 3), (2, "Grouches", 1), (3, "Tarantulas", 1), (4, "Snakes", 0)])
+        # Tarantulas beat Lions, Lions beat Snakes: level on points they are ordered head-to-head.
+        self.assertEqual(self.table(3), [(1, "Tarantulas", 4), (2, "Lions", 4), (3, "Snakes", 3), (4, "Grouches", 2)])
+        self.assertEqual(StandingsSnapshot.objects.count(), 12)
+        self.assertEqual(
+            get_team_history(Season.objects.get(pk=self.season.pk), Team.objects.get(name="Lions")),
+            [
+                {"round": 1, "position": 1, "points": 3},
+                {"round": 2, "position": 2, "points": 3},
+                {"round": 3, "position": 2, "points": 4},
+            ],
+        )
+
+        season = Season.objects.get(pk=self.season.pk)
+        with self.assertNumQueries(1):
+            get_table_after_round(season, 2)
+
+    def test_old_game_edit_rebuilds_later_rounds(self):
+        self.table(3)
+        first_round = set(StandingsSnapshot.objects.filter(round=1).values_list("pk", flat=True))
+
+        game = Game.objects.get(fixture_id="F2")
+        game.first_team_score = 3
+        game.save()
+        self.assertEqual(Season.objects.get(pk=self.season.pk).history_stale_from, 2)
+        self.assertEqual(rebuild_history(self.season), 2)
+        self.assertEqual(set(StandingsSnapshot.objects.filter(round=1).values_list("pk", flat=True)), first_round)
+        self.assertEqual(self.table(3), [(1, "Lions", 7), (2, "Snakes", 3), (3, "Grouches", 2), (4, "Tarantulas", 1)])
+
+        # The incremental snapshots match a rebuild from scratch.
+        expected = list(StandingsSnapshot.objects.order_by("round", "position").values_list("team", *SNAPSHOT_FIELDS))
+        self.assertEqual(rebuild_history(self.season, from_round=0), 4)
+        self.assertEqual(
+            list(StandingsSnapshot.objects.order_by("round", "position").values_list("team", *SNAPSHOT_FIELDS)),
+            expected,
+        )
+
+    def test_writes_invalidate_from_their_round(self):
+        self.table(3)
+        # The fixture moves from round 1 to round 3.
+        GameImporter(season=self.season).import_rows([["Lions", "0", "Snakes", "0", "F1", "3"]])
+        self.assertEqual(Season.objects.get(pk=self.season.pk).history_stale_from, 1)
+        self.assertEqual(self.table(1), [(1, "Grouches", 1), (2, "Tarantulas", 1)])
+
+        bulk_delete_games(Game.objects.filter(round=3))
+        self.assertEqual(Season.objects.get(pk=self.season.pk).history_stale_from, 3)
+        self.assertEqual(self.table(3), [])
+        self.assertEqual(len(self.table(2)), 4)
+
+    def test_round_after_a_gap_keeps_the_running_total(self):
+        season = Season.objects.create(league=self.season.league, name="2027")
+        GameImporter(season=season).import_rows([["A", "1", "B", "0", "", "1"]])
+        self.assertEqual(rebuild_history(season), 1)
+        GameImporter(season=season).import_rows([["A", "2", "B", "0", "", "3"]])
+
+        season = Season.objects.get(pk=season.pk)
+        self.assertEqual(self.table_of(season, 3), [(1, "A", 6), (2, "B", 0)])
+        self.assertEqual(self.table_of(season, 2), [(1, "A", 3), (2, "B", 0)])
+        self.assertEqual(self.table_of(season, 1), [(1, "A", 3), (2, "B", 0)])
+
+    def test_snapshots_follow_the_tiebreakers(self):
+        season = Season.objects.create(league=self.season.league, name="2027")
+        GameImporter(season=season).import_rows(
+            [
+                ["Tarantulas", "1", "Lions", "0", "", "1"],
+                ["Lions", "4", "Snakes", "0", "", "1"],
+                ["Snakes", "0", "Grouches", "0", "", "1"],
+            ]
+        )
+        table = [row["name"] for row in get_table_after_round(Season.objects.get(pk=season.pk), 1)]
+        # Lions have the better goal difference but lost to Tarantulas.
+        self.assertEqual(table, ["Tarantulas", "Lions", "Grouches", "Snakes"])
+        self.assertEqual(table, [row["name"] for row in get_ranking(season=season.pk)])
+
+    def test_history_view(self):
+        url = reverse("sports_league_app:standings_history", args=[self.season.pk])
+        # Reading a stale history rebuilds it, anonymous clients are sent to the login page.
+        self.assertEqual(self.client.get(url, {"round": 1}).status_code, 302)
+        self.assertEqual(Season.objects.get(pk=self.season.pk).history_stale_from, 1)
+
+        User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        response = self.client.get(url, {"round": 1})
+        self.assertEqual(response.json()["table"][0]["name"], "Lions")
+        response = self.client.get(url, {"team": "Snakes"})
+        self.assertEqual([row["position"] for row in response.json()["history"]], [4, 3, 3])
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class RatingTestCase(TestCase):
+    rows = [
+        ["Lions", "2", "Snakes", "0", "F1"],
+        ["Grouches", "1", "Tarantulas", "1"],
+        ["Snakes", "3", "Grouches", "0"],
+        ["Lions", "0", "Tarantulas", "1"],
+        ["Lions", "1", "Grouches", "1"],
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+
+    def ratings(self):
+        return dict(Team.objects.values_list("name", "rating"))
+
+    def assertRatingsReplayed(self, stale=True):
+        # Changes to past games only mark the ratings stale, the job runner replays them.
+        self.assertEqual(RatingsState.objects.get().stale, stale)
+        run_pending_jobs()
+        self.assertFalse(RatingsState.objects.get().stale)
+        ratings = self.ratings()
+        Team.objects.rebuild_ratings(Game.objects.all())
+        for name, rating in self.ratings().items():
+            self.assertAlmostEqual(ratings[name], rating)
+
+    def test_game_updates_ratings(self):
+        lions, snakes = Team.objects.create(name="Lions"), Team.objects.create(name="Snakes")
+        game = Game.objects.create(first_team=lions, first_team_score=1, second_team=snakes, second_team_score=0)
+        self.assertEqual(self.ratings(), {"Lions": 1510.0, "Snakes": 1490.0})
+
+        with self.assertNumQueries(2):
+            Team.objects.rate_games([game])
+        ratings = self.ratings()
+        self.assertAlmostEqual(ratings["Lions"] + ratings["Snakes"], 3000.0)
+        self.assertGreater(ratings["Lions"], 1510.0)
+
+    def test_incremental_ratings_match_rebuild(self):
+        GameImporter(batch_size=2).import_rows(self.rows)
+        self.assertRatingsReplayed(stale=False)
+
+        # The fixture's result flips, the ratings after it are replayed.
+        GameImporter().import_rows([["Lions", "0", "Snakes", "1", "F1"]])
+        self.assertRatingsReplayed()
+
+        game = Game.objects.get(first_team__name="Snakes")
+        ratings = self.ratings()
+        self.client.post(
+            reverse("sports_league_app:edit_game", args=[game.pk]), {"first_team_score": 0, "second_team_score": 0}
+        )
+        # The request leaves the ratings alone.
+        self.assertEqual(self.ratings(), ratings)
+        self.assertRatingsReplayed()
+
+        Game.objects.get(fixture_id="F1").delete()
+        self.assertRatingsReplayed()
+        bulk_delete_games(Game.objects.filter(first_team__name="Lions"))
+        self.assertRatingsReplayed()
+
+    def test_stale_ratings_wake_the_workers(self):
+        GameImporter().import_rows(self.rows)
+        with patch("sports_league_app.jobs.wake_workers") as wake_workers:
+            with self.captureOnCommitCallbacks(execute=True):
+                Game.objects.get(fixture_id="F1").delete()
+                wake_workers.assert_not_called()
+        wake_workers.assert_called_once_with()
+
+    def test_changes_during_replay_keep_ratings_stale(self):
+        GameImporter().import_rows(self.rows)
+        RatingsState.objects.mark_stale()
+        rebuild_ratings = TeamQuerySet.rebuild_ratings
+
+        def rebuild_and_delete(games, chunk_size):
+            played = rebuild_ratings(Team.objects.all(), games, chunk_size)
+            Game.objects.get(fixture_id="F1").delete()
+            return played
+
+        with patch.object(TeamQuerySet, "rebuild_ratings", side_effect=rebuild_and_delete):
+            self.assertEqual(rebuild_stale_ratings(), 5)
+        self.assertTrue(RatingsState.objects.get().stale)
+        self.assertEqual(rebuild_stale_ratings(), 4)
+        self.assertFalse(RatingsState.objects.get().stale)
+        self.assertEqual(rebuild_stale_ratings(), 0)
+
+    def test_rebuild_command(self):
+        GameImporter().import_rows(self.rows)
+        ratings = self.ratings()
+        Team.objects.update(rating=1500.0)
+        RatingsState.objects.mark_stale()
+        out = io.StringIO()
+        call_command("rebuild_ratings", "--chunk-size", "2", stdout=out)
+        self.assertIn("Rebuilt ratings from 5 games", out.getvalue())
+        self.assertFalse(RatingsState.objects.get().stale)
+        for name, rating in self.ratings().items():
+            self.assertAlmostEqual(ratings[name], rating)
+
+
+class RankingCacheTestCase(TestCase):
+    def setUp(self):
+        self.first_team = Team.objects.create(name="Team 1")
+        self.second_team = Team.objects.create(name="Team 2")
+
+    def test_ranking_cached_until_games_change(self):
+        self.assertEqual(get_ranking()[0]["points"], 0)
+        with self.assertNumQueries(0):
+            get_ranking()
+        self.assertEqual(cache_stats()["misses"], 1)
+        self.assertEqual(cache_stats()["hits"], 1)
+
+        game = Game.objects.create(
+            first_team=self.first_team, first_team_score=1, second_team=self.second_team, second_team_score=0
+        )
+        self.assertEqual(get_ranking()[0], {"rank": 1, "name": "Team 1", "points": 3})
+        game.delete()
+        self.assertEqual(get_ranking()[0], {"rank": 1, "name": "Team 1", "points": 0})
+
+        GameImporter().import_rows([["Team 2", "2", "Team 1", "0"]])
+        self.assertEqual(get_ranking()[0], {"rank": 1, "name": "Team 2", "points": 3})
+        self.assertEqual(cache_stats()["misses"], 4)
+
+
+class GameListTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test_user", password="test_password")
+        self.client.login(username="test_user", password="test_password")
+        GameImporter().import_rows(GameImporterTestCase.rows * 40)
+        self.game_ids = list(Game.objects.order_by("-pk").values_list("pk", flat=True))
+
+    def test_team_names_do_not_add_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("sports_league_app:games_list"))
+        self.assertContains(response, "Tarantulas")
+        self.assertEqual([game.pk for game in response.context["object_list"]], self.game_ids[:100])
+        self.assertLess(len(queries), 10)
+
+    def test_page_count_served_from_cache(self):
+        url = reverse("sports_league_app:games_list")
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(response.context["paginator"].num_pages, 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {"page": 2})
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GameImporter().import_rows(GameImporterTestCase.rows * 10)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"page": 2})
+        self.assertEqual(response.context["paginator"].count, 300)
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"]])
+
+    def test_season_filter_is_counted_and_kept_across_pages(self):
+        season = Season.objects.create(league=League.objects.create(name="Premier"), name="2026")
+        GameImporter(season=season).import_rows(GameImporterTestCase.rows * 30)
+        url = reverse("sports_league_app:games_list")
+        self.client.get(url)
+
+        response = self.client.get(url, {"season": season.pk})
+        self.assertEqual(response.context["paginator"].count, 180)
+        self.assertEqual(response.context["paginator"].num_pages, 2)
+        self.assertContains(response, f"?page=2&season={season.pk}")
+
+        response = self.client.get(url, {"season": season.pk, "page": 2})
+        self.assertEqual(len(response.context["object_list"]), 80)
+        self.assertTrue(all(game.season_id == season.pk for game in response.context["object_list"]))
+
+        response = self.client.get(url, {"season": season.pk, "after": ""})
+        self.assertContains(response, f"&season={season.pk}")
+
+    @override_settings(GAMES_LIST_COUNT="estimated")
+    def test_estimated_count_falls_back_to_exact(self):
+        response = self.client.get(reverse("sports_league_app:games_list"))
+        self.assertEqual(response.context["paginator"].count, 240)
+
+    def test_keyset_pagination(self):
+        url = reverse("sports_league_app:games_list")
+        response = self.client.get(url, {"after": ""})
+        page = response.context["page_obj"]
+        self.assertEqual([game.pk for game in page], self.game_ids[:100])
+        self.assertFalse(page.has_previous())
+
+        response = self.client.get(url, {"after": page.next_cursor})
+        page = response.context["page_obj"]
+        self.assertEqual([game.pk for game in page], self.game_ids[100:200])
+        self.assertContains(response, f"?before={self.game_ids[100]}")
+
+        response = self.client.get(url, {"before": page.previous_cursor})
+        self.assertEqual([game.pk for game in response.context["page_obj"]], self.game_ids[:100])
+
+        response = self.client.get(url, {"after": self.game_ids[199]})
+        page = response.context["page_obj"]
+        self.assertEqual([game.pk for game in page], self.game_ids[200:])
+        self.assertFalse(page.has_next())
+
+
 class GameAddViewTestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="test_user", password="test_password")
@@ -211,3 +1555,37 @@ class GameEditViewTestCase(TestCase):
         self.assertEqual(second_team.loses, 0)
         self.assertEqual(second_team.wins, 1)
         self.assertEqual(second_team.points, 3)
+
+    def test_game_edit_writes_only_net_change(self):
+        first_team = Team.objects.create(name="Team 1")
+        second_team = Team.objects.create(name="Team 2")
+        game = Game.objects.create(
+            first_team=first_team, first_team_score=2, second_team=second_team, second_team_score=1
+        )
+        url = reverse("sports_league_app:edit_game", args=[game.id])
+
+        # Same score, only the game row is written.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {"first_team_score": 2, "second_team_score": 1})
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertFalse([query for query in updates if "sports_league_app_team" in query])
+
+        # Same winner, the goals counters take one UPDATE per team.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {"first_team_score": 4, "second_team_score": 0})
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 3)
+        first_team.refresh_from_db()
+        self.assertEqual((first_team.wins, first_team.goals_for, first_team.goal_difference), (1, 4, 4))
+
+        # From a win to a draw, one UPDATE per team and one marking the ratings stale.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {"first_team_score": 1, "second_team_score": 1})
+        writes = [query["sql"] for query in queries if query["sql"].startswith(("UPDATE", "INSERT", "DELETE"))]
+        self.assertEqual(len(writes), 4)
+        self.assertEqual(len([query for query in writes if "sports_league_app_team" in query]), 2)
+        self.assertEqual(len([query for query in writes if "sports_league_app_ratingsstate" in query]), 1)
+        first_team.refresh_from_db()
+        second_team.refresh_from_db()
+        self.assertEqual((first_team.wins, first_team.draws, first_team.points), (0, 1, 1))
+        self.assertEqual((second_team.loses, second_team.draws, second_team.points), (0, 1, 1))
@@ -0,0 +1,172 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+
+
+@dataclass
+class Record:
+    """
+    Results and goals of a team, against one opponent or over all of its games.
+    """
+
+    wins: int = 0
+    draws: int = 0
+    loses: int = 0
+    goals_for: int = 0
+    goals_against: int = 0
+
+    def __add__(self, other):
+        return Record(
+            self.wins + other.wins,
+            self.draws + other.draws,
+            self.loses + other.loses,
+            self.goals_for + other.goals_for,
+            self.goals_against + other.goals_against,
+        )
+
+    @property
+    def goal_difference(self):
+        return self.goals_for - self.goals_against
+
+
+def team_record(row):
+    """
+    Return the overall Record of a Team or TeamSeasonStanding row from its counters.
+    """
+    return Record(row.wins, row.draws, row.loses, row.goals_for, row.goals_against)
+
+
+class ResultsMatrix:
+    """
+    Team x team results of a set of teams, read with a single aggregated query.
+
+    `results[(team, opponent)]` is the record of `team` against `opponent` within the set,
+    `totals[team]` its record over all of its games, taken from the standings counters.
+    """
+
+    def __init__(self, team_ids, games, totals):
+        self.results = defaultdict(Record)
+        self.totals = totals
+        pairs = (
+            games.filter(first_team__in=team_ids, second_team__in=team_ids)
+            .order_by()
+            .values("first_team", "second_team")
+            .annotate(
+                first_team_wins=Count("pk", filter=Q(first_team_score__gt=F("second_team_score"))),
+                draws=Count("pk", filter=Q(first_team_score=F("second_team_score"))),
+                second_team_wins=Count("pk", filter=Q(first_team_score__lt=F("second_team_score"))),
+                first_team_goals=Sum("first_team_score"),
+                second_team_goals=Sum("second_team_score"),
+            )
+        )
+        for pair in pairs:
+            first_team, second_team = pair["first_team"], pair["second_team"]
+            self.results[(first_team, second_team)] += Record(
+                pair["first_team_wins"],
+                pair["draws"],
+                pair["second_team_wins"],
+                pair["first_team_goals"],
+                pair["second_team_goals"],
+            )
+            self.results[(second_team, first_team)] += Record(
+                pair["second_team_wins"],
+                pair["draws"],
+                pair["first_team_wins"],
+                pair["second_team_goals"],
+                pair["first_team_goals"],
+            )
+
+    def head_to_head(self, team, group):
+        record = Record()
+        for opponent in group:
+            if opponent != team:
+                record += self.results.get((team, opponent), Record())
+        return record
+
+
+def head_to_head_points(matrix, team, group, points_strategy):
+    return points_strategy.calculate_points(matrix.head_to_head(team, group))
+
+
+def head_to_head_goal_difference(matrix, team, group, points_strategy):
+    return matrix.head_to_head(team, group).goal_difference
+
+
+def head_to_head_goals_for(matrix, team, group, points_strategy):
+    return matrix.head_to_head(team, group).goals_for
+
+
+def goal_difference(matrix, team, group, points_strategy):
+    return matrix.totals[team].goal_difference
+
+
+def goals_for(matrix, team, group, points_strategy):
+    return matrix.totals[team].goals_for
+
+
+def wins(matrix, team, group, points_strategy):
+    return matrix.totals[team].wins
+
+
+# Every rule returns the value of `team` within its tied `group`, higher ranks first.
+TIEBREAK_RULES = {
+    "head_to_head_points": head_to_head_points,
+    "head_to_head_goal_difference": head_to_head_goal_difference,
+    "head_to_head_goals_for": head_to_head_goals_for,
+    "goal_difference": goal_difference,
+    "goals_for": goals_for,
+    "wins": wins,
+}
+
+
+def resolve_group(group, matrix, points_strategy, rules):
+    """
+    Order a group of teams level on points and return it as a list of sub-groups that are
+    still level after all rules.
+
+    Teams separated from the rest of the group but level among themselves are resolved
+    again, their head-to-head rules then only count the games between them.
+    """
+    keys = {
+        team: tuple(TIEBREAK_RULES[rule](matrix, team, group, points_strategy) for rule in rules) for team in group
+    }
+    resolved = []
+    for _, subgroup in groupby(sorted(group, key=keys.get, reverse=True), key=keys.get):
+        subgroup = list(subgroup)
+        if 1 < len(subgroup) < len(group):
+            resolved.extend(resolve_group(subgroup, matrix, points_strategy, rules))
+        else:
+            resolved.append(subgroup)
+    return resolved
+
+
+def break_ties(ranking, team_ids, games, points_strategy, totals, rules=None):
+    """
+    Reorder the runs of ranking rows level on points with the tiebreak `rules`
+    (STANDINGS_TIEBREAKERS by default) and rank them accordingly.
+
+    `team_ids` are the team ids of the `ranking` rows, `games` the games the
+    head-to-head results are read from and `totals` the {team_id: Record} overall records
+    of the rows. Rows still level after every rule keep their order and share a rank. The
+    results matrix of the games between tied teams is read with one query.
+    """
+    if rules is None:
+        rules = settings.STANDINGS_TIEBREAKERS
+    groups = [list(group) for _, group in groupby(zip(ranking, team_ids), key=lambda item: item[0]["points"])]
+    tied = [team_id for group in groups if len(group) > 1 for _, team_id in group]
+    if not rules or not tied:
+        return ranking
+
+    matrix = ResultsMatrix(tied, games, totals)
+    resolved_ranking = []
+    for group in groups:
+        rank = group[0][0]["rank"]
+        rows = dict((team_id, row) for row, team_id in group)
+        for subgroup in resolve_group(list(rows), matrix, points_strategy, rules) if len(group) > 1 else [list(rows)]:
+            for team_id in subgroup:
+                resolved_ranking.append(dict(rows[team_id], rank=rank))
+            rank += len(subgroup)
+    return resolved_ranking
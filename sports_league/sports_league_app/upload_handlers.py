@@ -0,0 +1,29 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """
+    Compute the SHA-256 of every uploaded file while it streams in.
+
+    The chunks are passed on untouched, so the next handler in the chain still builds the
+    uploaded file. Digests are collected in `content_hashes` by field name.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.content_hashes = {}
+        self.sha256 = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.content_hashes[self.field_name] = self.sha256.hexdigest()
+        return None
@@ -9,6 +9,15 @@ urlpatterns = [
     path("add-game/", views.GameAddView.as_view(), name="add_game"),
     path("edit-game/<int:pk>/", views.GameEditView.as_view(), name="edit_game"),
     path("delete-game/<int:pk>/", views.GameDeleteView.as_view(), name="delete_game"),
+    path("delete-games/", views.GameBulkDeleteView.as_view(), name="bulk_delete_games"),
+    path("standings/", views.StandingsView.as_view(), name="standings"),
+    path("standings/cache-stats/", views.StandingsCacheStatsView.as_view(), name="standings_cache_stats"),
+    path("standings/history/<int:season>/", views.StandingsHistoryView.as_view(), name="standings_history"),
+    path("ingest/games/", views.IngestGamesView.as_view(), name="ingest_games"),
+    path("export/<str:dataset>/", views.ExportView.as_view(), name="export"),
+    path("upload-batches/", views.UploadBatchList.as_view(), name="upload_batches"),
+    path("upload-batches/<int:pk>/rollback/", views.UploadBatchRollbackView.as_view(), name="rollback_upload_batch"),
+    path("import-jobs/<int:pk>/", views.ImportJobProgressView.as_view(), name="import_job_progress"),
     # path('', views.upload_csv, name='upload_csv'),
     # path('games-list/', views.game_list, name='games_list'),
     # path('add-game/', views.add_game, name='add_game'),
@@ -1,78 +1,280 @@
-import csv
-import io
+import json
+from datetime import datetime
 
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from django.http import JsonResponse
-from django.shortcuts import render
-from django.urls import reverse_lazy
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
+from .cache import cache_stats, get_standings_changed_at, get_standings_version
+from .exporters import EXPORT_CONTENT_TYPES, EXPORT_DATASETS, EXPORT_FORMATS, export_lines
 from .forms import GameAddForm, GameEditForm
-from .models import Game, Team
+from .history import get_table_after_round, get_team_history
+from .importers import CSVStreamReader, GameImporter, InvalidCSVFormat
+from .ingest import has_valid_token, ingest_records, ndjson_records
+from .jobs import enqueue_import, find_imported_batch
+from .models import Game, ImportJob, RatingsState, Season, Team, TeamSeasonStanding, UploadBatch
+from .pagination import CachedCountPaginator, keyset_paginate
+from .ratings import result_score
+from .standings import bulk_delete_games, get_ranking, get_team_ranking_row, rollback_upload_batch
 
 
-from .strategy import DefaultPointsCalculation
+from .strategy import DEFAULT_SCHEME, POINTS_STRATEGIES, DefaultPointsCalculation, merge_deltas
+from .upload_handlers import ContentHashUploadHandler
 
 # Create your views here.
 
 # CBV
 
 
+def season_param(params):
+    try:
+        return int(params["season"])
+    except (KeyError, ValueError):
+        return None
+
+
+def ranking_params(request):
+    """
+    Read the `?top=N`, `?scheme=<name>` and `?season=<id>` ranking parameters, ignoring
+    invalid values.
+    """
+    try:
+        top = int(request.GET["top"])
+    except (KeyError, ValueError):
+        top = None
+    scheme = request.GET.get("scheme")
+    if scheme not in POINTS_STRATEGIES:
+        scheme = DEFAULT_SCHEME
+    return (top if top and top > 0 else None), scheme, season_param(request.GET)
+
+
+def standings_etag(request):
+    top, scheme, season = ranking_params(request)
+    return f"{get_standings_version()}-{scheme}-{season or 'all'}-{top or 'all'}"
+
+
+def standings_last_modified(request):
+    return datetime.fromtimestamp(get_standings_changed_at(), tz=timezone.utc)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
 class UploadCSVView(LoginRequiredMixin, View):
     template_name = "sport_league_app/upload_csv.html"
 
     def get(self, request):
-        teams = Team.objects.all().order_by("-points", "name")
-        ranking_data = []
-        for rank, team in enumerate(teams, start=1):
-            ranking_data.append({"rank": rank, "name": team.name, "points": team.points})
-        return render(request, self.template_name, {"ranking": ranking_data})
+        """
+        `?top=N` limits the table to its first N rows; `?team=<name>` adds that team's row
+        when it falls outside of them; `?scheme=<name>` ranks the teams under another
+        scoring scheme from `POINTS_STRATEGIES`; `?season=<id>` ranks them within one season.
+        """
+        top, scheme, season = ranking_params(request)
+        ranking = get_ranking(top=top, scheme=scheme, season=season)
+        context = {
+            "ranking": ranking,
+            "scheme": scheme,
+            "schemes": list(POINTS_STRATEGIES),
+            "season": season,
+            "seasons": Season.objects.select_related("league").order_by("-pk"),
+        }
+        team_name = request.GET.get("team")
+        if team_name and not any(row["name"] == team_name for row in ranking):
+            context["team_row"] = get_team_ranking_row(team_name, scheme=scheme, season=season)
+        return render(request, self.template_name, context)
 
     def post(self, request):
+        # The content hash is computed while the upload streams in, which requires adding
+        # the handler before anything (including the CSRF check) reads request.FILES.
+        content_hasher = ContentHashUploadHandler(request)
+        request.upload_handlers.insert(0, content_hasher)
+        return self.import_upload(request, content_hasher)
+
+    @method_decorator(csrf_protect)
+    def import_upload(self, request, content_hasher):
         if request.FILES.get("csv_file"):
             csv_file = request.FILES["csv_file"]
-            file = csv_file.read().decode("UTF-8")
-            io_string = io.StringIO(file)
-            next(io_string)
+            file_hash = content_hasher.content_hashes["csv_file"]
+            season = Season.objects.filter(pk=season_param(request.POST)).first()
+            previous_upload = find_imported_batch(file_hash)
+            if previous_upload is not None:
+                messages.warning(
+                    request,
+                    f"{csv_file.name} was already imported on {previous_upload.created_at:%Y-%m-%d %H:%M}, skipped.",
+                    extra_tags="warning-message",
+                )
+                return render(request, self.template_name, {"ranking": get_ranking()})
+            if request.POST.get("background"):
+                job = enqueue_import(csv_file, file_hash=file_hash, season=season)
+                return render(request, self.template_name, {"ranking": get_ranking(), "import_job": job})
             try:
-                for row in csv.reader(io_string, delimiter=","):
-                    if len(row) != 4:
-                        return JsonResponse({"error_message": "Invalid CSV Format"})
-                    first_team_name, first_team_score, second_team_name, second_team_score = row
-                    first_team, first_team_created = Team.objects.get_or_create(name=first_team_name)
-                    second_team, second_team_created = Team.objects.get_or_create(name=second_team_name)
-
-                    game = Game.objects.create(
-                        first_team=first_team,
-                        first_team_score=first_team_score,
-                        second_team=second_team,
-                        second_team_score=second_team_score,
+                with transaction.atomic():
+                    upload_batch = UploadBatch.objects.create(
+                        file_name=csv_file.name, content_hash=file_hash, started_at=timezone.now(), season=season
                     )
+                    importer = GameImporter(upload_batch=upload_batch, season=season)
+                    upload_batch.finish(importer.import_rows(CSVStreamReader(csv_file.chunks())))
+                return render(request, self.template_name, {"ranking": get_ranking()})
 
-                teams = Team.objects.all().order_by("-points", "name")
-                ranking_data = []
-                for rank, team in enumerate(teams, start=1):
-                    ranking_data.append({"rank": rank, "name": team.name, "points": team.points})
-                return render(request, self.template_name, {"ranking": ranking_data})
-
+            except InvalidCSVFormat as e:
+                return JsonResponse({"error_message": str(e)})
             except Exception as e:
                 return render(request, self.template_name, {"error_message": str(e)})
 
         return render(request, self.template_name)
 
 
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
+@method_decorator(condition(etag_func=standings_etag, last_modified_func=standings_last_modified), name="get")
+class StandingsView(LoginRequiredMixin, View):
+    """
+    The ranking table as JSON, for signed-in clients polling the standings.
+
+    The ETag and Last-Modified headers come from the standings version kept in the cache,
+    so a conditional request for unchanged standings is answered with 304 Not Modified
+    without querying the standings. Takes the same `?top` and `?scheme` parameters as the
+    page.
+    """
+
+    def get(self, request):
+        top, scheme, season = ranking_params(request)
+        return JsonResponse(
+            {"scheme": scheme, "season": season, "ranking": get_ranking(top=top, scheme=scheme, season=season)}
+        )
+
+
+class StandingsHistoryView(LoginRequiredMixin, View):
+    """
+    The standings history of a season as JSON: `?round=N` gives the table after round N,
+    `?team=<name>` the team's position and points after every round.
+    """
+
+    def get(self, request, season):
+        season = get_object_or_404(Season, pk=season)
+        team_name = request.GET.get("team")
+        if team_name:
+            team = get_object_or_404(Team, name=team_name)
+            return JsonResponse({"season": season.pk, "team": team.name, "history": get_team_history(season, team)})
+        try:
+            round_number = int(request.GET["round"])
+        except (KeyError, ValueError):
+            return JsonResponse({"error_message": "Expected a round or a team"}, status=400)
+        return JsonResponse(
+            {"season": season.pk, "round": round_number, "table": get_table_after_round(season, round_number)}
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
+class IngestGamesView(View):
+    """
+    Bulk game ingest for results feeds.
+
+    Takes a JSON array of game objects, or one object per line when the content type is
+    `application/x-ndjson`, authenticated with an `Authorization: Bearer <token>` header.
+    Valid games go through the CSV import engine in INGEST_BATCH_SIZE transactions, the
+    response lists the result of every row. `?season=<id>` adds the games to a season.
+    """
+
+    def post(self, request):
+        if not has_valid_token(request):
+            return JsonResponse({"error_message": "Invalid or missing API token"}, status=401)
+        season = None
+        if "season" in request.GET:
+            season = Season.objects.filter(pk=season_param(request.GET)).first()
+            if season is None:
+                return JsonResponse({"error_message": "Unknown season"}, status=400)
+        if request.content_type == "application/x-ndjson":
+            records = ndjson_records(request)
+        else:
+            try:
+                records = json.loads(request.body)
+            except ValueError:
+                return JsonResponse({"error_message": "Invalid JSON"}, status=400)
+            if not isinstance(records, list):
+                return JsonResponse({"error_message": "Expected a JSON array of games"}, status=400)
+        return JsonResponse(ingest_records(records, season=season))
+
+
+class ExportView(LoginRequiredMixin, View):
+    """
+    Stream the games or the standings as CSV (default) or NDJSON, `?format=ndjson`, of
+    all seasons or of `?season=<id>`.
+    """
+
+    def get(self, request, dataset):
+        export_format = request.GET.get("format", "csv")
+        if dataset not in EXPORT_DATASETS or export_format not in EXPORT_FORMATS:
+            raise Http404
+        response = StreamingHttpResponse(
+            export_lines(dataset, export_format, season=season_param(request.GET)),
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="{dataset}.{export_format}"'
+        return response
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class StandingsCacheStatsView(View):
+    def get(self, request):
+        return JsonResponse(cache_stats())
+
+
+class ImportJobProgressView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        job = get_object_or_404(ImportJob, pk=pk)
+        return JsonResponse(job.progress())
+
+
 class GameList(LoginRequiredMixin, ListView):
     model = Game
     template_name = "sport_league_app/games_list.html"
     paginate_by = 100
+    paginator_class = CachedCountPaginator
+    ordering = ["-pk"]
+
+    def get_queryset(self):
+        """
+        `?season=<id>` lists the games of one season.
+        """
+        queryset = super().get_queryset().select_related("first_team", "second_team")
+        season = season_param(self.request.GET)
+        if season is not None:
+            queryset = queryset.filter(season=season)
+        return queryset
+
+    def get_cursor(self, name):
+        try:
+            return int(self.request.GET[name])
+        except (KeyError, ValueError):
+            return None
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Use keyset pagination when enabled by `GAMES_LIST_PAGINATION` or when the request
+        carries an `after`/`before` cursor, OFFSET pagination otherwise.
+        """
+        keyset = "after" in self.request.GET or "before" in self.request.GET
+        if settings.GAMES_LIST_PAGINATION != "keyset" and not keyset:
+            return super().paginate_queryset(queryset, page_size)
+        page = keyset_paginate(queryset, page_size, after=self.get_cursor("after"), before=self.get_cursor("before"))
+        return None, page, page.object_list, page.has_next() or page.has_previous()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["now"] = timezone.now()
+        context["season"] = season_param(self.request.GET)
         return context
 
 
@@ -100,18 +302,85 @@ class GameEditView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy("sports_league_app:games_list")
     pk_url_kwarg = "pk"
 
+    def get_queryset(self):
+        return super().get_queryset().select_related("first_team", "second_team")
+
     def form_valid(self, form, points_strategy=None):
         if points_strategy is None:
             points_strategy = DefaultPointsCalculation()
-        cleaned_data = form.cleaned_data
-        game = self.get_object()
-        points_strategy.update_teams(game, delete=True)
-        game.first_team_score = cleaned_data["first_team_score"]
-        game.second_team_score = cleaned_data["second_team_score"]
-        game.save()
-        points_strategy.update_teams(game)
+        # The form has already copied the new scores onto the game, the old ones are its initial data.
+        old_first_team_score = form.initial["first_team_score"]
+        old_second_team_score = form.initial["second_team_score"]
+        if form.has_changed():
+            self.object = form.save(commit=False)
+            self.object.save(update_fields=["first_team_score", "second_team_score"])
+            points_strategy.update_score(self.object, old_first_team_score, old_second_team_score)
+            if self.object.season_id is not None:
+                old_game = Game(
+                    first_team_id=self.object.first_team_id,
+                    first_team_score=old_first_team_score,
+                    second_team_id=self.object.second_team_id,
+                    second_team_score=old_second_team_score,
+                    season_id=self.object.season_id,
+                )
+                deltas = merge_deltas(
+                    points_strategy.apply_games([old_game], sign=-1), points_strategy.apply_games([self.object])
+                )
+                TeamSeasonStanding.objects.apply_deltas(self.object.season_id, deltas, points_strategy)
+            if result_score(old_first_team_score, old_second_team_score) != result_score(
+                self.object.first_team_score, self.object.second_team_score
+            ):
+                # The ratings after this game depend on its result.
+                RatingsState.objects.mark_stale()
         messages.success(self.request, "Game Has Been Edited successfully.", extra_tags="success-message")
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class GameBulkDeleteView(LoginRequiredMixin, View):
+    """
+    Delete the games listed in `ids`, every game of the team given as `team` or every
+    game of the upload batch given as `upload_batch`.
+    """
+
+    success_url = reverse_lazy("sports_league_app:games_list")
+
+    def get_games(self, request):
+        ids = [pk for pk in request.POST.getlist("ids") if pk.isdigit()]
+        if ids:
+            return Game.objects.filter(pk__in=ids)
+        team = request.POST.get("team", "")
+        if team.isdigit():
+            return Game.objects.filter(Q(first_team=team) | Q(second_team=team))
+        upload_batch = request.POST.get("upload_batch", "")
+        if upload_batch.isdigit():
+            return Game.objects.filter(upload_batch=upload_batch)
+        return None
+
+    def post(self, request):
+        games = self.get_games(request)
+        if games is None:
+            messages.error(request, "No games selected.", extra_tags="error-message")
+        else:
+            deleted = bulk_delete_games(games)
+            messages.success(request, f"{deleted} games have been deleted successfully.", extra_tags="success-message")
+        return HttpResponseRedirect(self.success_url)
+
+
+class UploadBatchList(LoginRequiredMixin, ListView):
+    model = UploadBatch
+    template_name = "sport_league_app/upload_batches.html"
+    paginate_by = 100
+    ordering = ["-pk"]
+
+
+class UploadBatchRollbackView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        upload_batch = get_object_or_404(UploadBatch, pk=pk)
+        deleted = rollback_upload_batch(upload_batch)
+        messages.success(
+            request, f"{upload_batch} has been rolled back, {deleted} games deleted.", extra_tags="success-message"
+        )
+        return HttpResponseRedirect(reverse("sports_league_app:upload_batches"))
 
 
 class GameDeleteView(LoginRequiredMixin, DeleteView):